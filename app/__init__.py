@@ -5,32 +5,49 @@ import json
 import logging
 import re
 from datetime import timedelta
+from logging.handlers import RotatingFileHandler
 
 from flask import Flask
 from flask_wtf import CSRFProtect
 
+try:
+    import orjson
+except ImportError:  # optional: fallback ke stdlib json
+    orjson = None
+
 from .config import Config
 
 csrf = CSRFProtect()
 
 _ANSI_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
 _ALLOWED_LOG_LEVELS = {"CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"}
+_ACCESS_LOG_DIR = "logs"
+_ACCESS_LOG_FILE = os.path.join(_ACCESS_LOG_DIR, "github_access.log")
+_SKIP_PATHS = frozenset(("/ping", "/csrf-token"))
+# Access log werkzeug: '"GET /ping HTTP/1.1" 204 -' (bisa dibungkus escape ANSI)
+_REQUEST_LINE_RE = re.compile(r"[A-Z]+ (\S+) HTTP/")
 
 
 def _strip_ansi(text: str) -> str:
-    if not text:
+    # Fast path: sebagian besar record tidak mengandung ESC sama sekali
+    if not text or "\x1b" not in text:
         return text
     return _ANSI_RE.sub("", text)
 
 
 class _RequestLogFilter(logging.Filter):
-    _SKIP_PATHS = ("/ping", "/csrf-token")
-
     def filter(self, record: logging.LogRecord) -> bool:
         if record.name != "werkzeug":
             return True
-        msg = _strip_ansi(record.getMessage())
-        return not any(f" {path} " in msg for path in self._SKIP_PATHS)
+        # werkzeug: log('"%s" %s %s', request_line, code, size) -> baca args[0]
+        # langsung supaya record yang dibuang tidak perlu di-format
+        args = record.args
+        if isinstance(args, tuple) and args and isinstance(args[0], str):
+            source = args[0]
+        else:
+            source = record.getMessage()
+        match = _REQUEST_LINE_RE.search(source)
+        return match.group(1) not in _SKIP_PATHS if match else True
 
 
 class AnsiStrippingFormatter(logging.Formatter):
@@ -46,6 +63,8 @@ class JsonFormatter(logging.Formatter):
             "time": self.formatTime(record, self.datefmt),
             "name": record.name,
         }
+        if orjson is not None:
+            return orjson.dumps(log_record).decode("utf-8")
         return json.dumps(log_record)
 
 def configure_logging():
@@ -76,6 +95,18 @@ def configure_logging():
         lg.handlers.clear()
         lg.propagate = True
 
+    # Audit log login GitHub Access: file dibuka sekali, bukan per percobaan login
+    os.makedirs(_ACCESS_LOG_DIR, exist_ok=True)
+    access_handler = RotatingFileHandler(_ACCESS_LOG_FILE, maxBytes=1_000_000, backupCount=3)
+    access_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    access_logger = logging.getLogger("github_access")
+    for handler in list(access_logger.handlers):
+        access_logger.removeHandler(handler)
+        handler.close()
+    access_logger.addHandler(access_handler)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
 def create_app():
     # Validate critical configs
     Config.validate()
@@ -103,11 +134,7 @@ def create_app():
     flask_app.logger.handlers.clear()
     flask_app.logger.propagate = True
 
-    # === IMPORTANT: import routes modules so @routes.route decorators are executed ===
-    from .routes import tools_routes          # noqa: F401
-    from .routes import github_access_routes  # noqa: F401
-    from .routes import repo_scan_routes      # noqa: F401
-    # Get blueprint after modules above are imported
+    # Importing the package runs every @routes.route decorator (see app/routes/__init__.py)
     from .routes import routes as routes_bp
     flask_app.register_blueprint(routes_bp)  # no url_prefix
 
@@ -26,15 +26,43 @@ class Config:
     SCANNER_HEAP_LIMIT = os.getenv("SCANNER_HEAP_LIMIT", "-Xmx1900m")
     CPU_NICE_ADJUSTMENT = int(os.getenv("CPU_NICE_ADJUSTMENT", "0"))
     CPU_AFFINITY = os.getenv("CPU_AFFINITY", "")
+    # Number of scan tasks processed concurrently by the background executor
+    WORKER_CONCURRENCY = max(1, int(os.getenv("WORKER_CONCURRENCY", "1")))
     SONAR_CPD_MINIMUM_TOKENS = os.getenv("SONAR_CPD_MINIMUM_TOKENS")
     SONAR_DEBUG = os.getenv("SONAR_DEBUG", "false").lower() in {"1", "true", "yes", "on"}
+    # Put the per-job scanner cache (SONAR_USER_HOME) on /dev/shm when writable with enough space
+    SONAR_PREFER_SHM = os.getenv("SONAR_PREFER_SHM", "false").lower() in {"1", "true", "yes", "on"}
+
+    # Git Clone Configs
+    # Reuse a bare repo cache under $SONAR_USER_HOME/git-cache instead of a fresh clone per scan
+    GIT_REPO_CACHE = os.getenv("GIT_REPO_CACHE", "false").lower() in {"1", "true", "yes", "on"}
+    # Cached bare repos unused for this many days are deleted (0 keeps them forever)
+    GIT_REPO_CACHE_MAX_AGE_DAYS = int(os.getenv("GIT_REPO_CACHE_MAX_AGE_DAYS", "7"))
+    # Keep finished clones and reuse them (fetch + reset) for the next scan of the same repo
+    GIT_REUSE_WORKDIRS = os.getenv("GIT_REUSE_WORKDIRS", "false").lower() in {"1", "true", "yes", "on"}
+    # Maximum number of kept clones (least recently used is deleted first)
+    GIT_REUSE_WORKDIRS_MAX = max(1, int(os.getenv("GIT_REUSE_WORKDIRS_MAX", "8")))
+    # Partial clone (--filter=blob:none) + protocol v2; disable for mirrors without support
+    GIT_PARTIAL_CLONE = os.getenv("GIT_PARTIAL_CLONE", "true").lower() in {"1", "true", "yes", "on"}
+    # Also fetch submodules (shallow, in parallel) so Sonar can analyze their sources
+    GIT_RECURSE_SUBMODULES = os.getenv("GIT_RECURSE_SUBMODULES", "false").lower() in {"1", "true", "yes", "on"}
     
     # SonarQube Web / Screenshot Configs (for Playwright)
     SONARQUBE_WEB_URL = os.getenv("SONARQUBE_WEB_URL")
     SONAR_USERNAME = os.getenv("SONAR_USERNAME")
     SONAR_PASSWORD = os.getenv("SONAR_PASSWORD")
     SCREENSHOT_TTL_HOURS = os.getenv("SCREENSHOT_TTL_HOURS", "24")
+    # How long (ms) the quality gate badge must stay unchanged before the screenshot is taken
+    SCREENSHOT_STABILITY_MS = int(os.getenv("SCREENSHOT_STABILITY_MS", "1000"))
+    # Screenshot file format: webp (needs Pillow, falls back to png), png, or jpeg
+    SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "webp")
+    # Encoder quality (1-100) for webp/jpeg screenshots
+    SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "85"))
     
+    # YAML Linter
+    # Number of lint results kept in the in-memory LRU cache (0 disables caching)
+    LINT_CACHE_SIZE = int(os.getenv("LINT_CACHE_SIZE", "100"))
+
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
     USE_JSON_LOG = os.getenv("USE_JSON_LOG", "true").lower() == "true"
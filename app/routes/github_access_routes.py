@@ -1,4 +1,6 @@
 # app/routes/github_access_routes.py
+from concurrent.futures import ThreadPoolExecutor
+
 from flask import render_template, request, redirect, url_for, session, jsonify, current_app
 from app.routes import routes
 from app.utils.constants import (
@@ -24,6 +26,37 @@ from app.utils.github_api import add_collaborator_to_repo, _get_auth_headers
 
 ERROR_INTERNAL_SERVER = "Terjadi kesalahan internal pada server"
 GITHUB_ACCESS_LOGIN_TEMPLATE = "github-access/github-access-login.html"
+# Batas request paralel ke GitHub API per submit
+MAX_GITHUB_WORKERS = 8
+
+# URL endpoint statis (tanpa argumen) di-resolve sekali per proses
+_STATIC_URLS = {}
+
+def _static_url(endpoint):
+    """url_for() yang di-cache; hanya untuk endpoint tanpa argumen."""
+    url = _STATIC_URLS.get(endpoint)
+    if url is None:
+        # Di-resolve di dalam request nyata agar prefix SCRIPT_NAME dari proxy ikut terbawa
+        url = _STATIC_URLS[endpoint] = url_for(endpoint)
+    return url
+
+def _add_collaborators(organization, identifier, repo_roles):
+    """
+    Panggil add_collaborator_to_repo untuk setiap (repo, role) secara paralel.
+    Urutan hasil sama dengan urutan input.
+    """
+    if not repo_roles:
+        return []
+
+    def _add(item):
+        repo_name, role = item
+        api_result = add_collaborator_to_repo(
+            owner=organization, repo=repo_name, username=identifier, permission=role
+        )
+        return {"repo": repo_name, **api_result}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_GITHUB_WORKERS, len(repo_roles))) as executor:
+        return list(executor.map(_add, repo_roles))
 
 ##########################################
 #   GitHub Access (Form & Logic)         #
@@ -32,8 +65,8 @@ GITHUB_ACCESS_LOGIN_TEMPLATE = "github-access/github-access-login.html"
 @routes.route('/github-access')
 def github_access():
     if not session.get('access_granted'):
-        session['next_url'] = url_for('routes.github_access')
-        return redirect(url_for(GITHUB_ACCESS_LOGIN_ROUTE))
+        session['next_url'] = _static_url(GITHUB_ACCESS_DASHBOARD_ROUTE)
+        return redirect(_static_url(GITHUB_ACCESS_LOGIN_ROUTE))
     return render_template('github-access/github-access.html')
 
 @routes.route('/github-access-submit', methods=['POST'])
@@ -48,12 +81,9 @@ def github_access_submit():
         access_role  = result['access_role']
         repos        = result['repositories']
 
-        github_results = []
-        for repo in repos:
-            api_result = add_collaborator_to_repo(
-                owner=organization, repo=repo, username=identifier, permission=access_role
-            )
-            github_results.append({"repo": repo, **api_result})
+        github_results = _add_collaborators(
+            organization, identifier, [(repo, access_role) for repo in repos]
+        )
 
         return jsonify({"success": True, "github_response": github_results}), 200
     except GitHubAccessError as e:
@@ -65,8 +95,8 @@ def github_access_submit():
 @routes.route('/github-access/edit', methods=['POST'])
 def github_access_edit_page():
     if not session.get('access_granted'):
-        session['next_url'] = url_for('routes.github_access')
-        return redirect(url_for(GITHUB_ACCESS_LOGIN_ROUTE))
+        session['next_url'] = _static_url(GITHUB_ACCESS_DASHBOARD_ROUTE)
+        return redirect(_static_url(GITHUB_ACCESS_LOGIN_ROUTE))
     try:
         identifier   = request.form.get("github_identifier")
         repos_input  = request.form.get("repositories")
@@ -96,12 +126,7 @@ def github_access_apply_roles():
         if len(repos) != len(roles):
             raise GitHubAccessError("Mismatch between repositories and roles count.")
 
-        github_results = []
-        for repo_name, role_for_repo in zip(repos, roles):
-            api_result = add_collaborator_to_repo(
-                owner=organization, repo=repo_name, username=identifier, permission=role_for_repo
-            )
-            github_results.append({"repo": repo_name, **api_result})
+        github_results = _add_collaborators(organization, identifier, list(zip(repos, roles)))
 
         return jsonify({"success": True, "github_response": github_results})
     except GitHubAccessError as e:
@@ -120,7 +145,7 @@ def github_access_login():
     ip    = get_client_ip()
 
     if session.get('access_granted'):
-        return redirect(url_for(GITHUB_ACCESS_DASHBOARD_ROUTE))
+        return redirect(_static_url(GITHUB_ACCESS_DASHBOARD_ROUTE))
 
     password_configured = is_access_password_configured()
     if not password_configured:
@@ -140,7 +165,7 @@ def github_access_login():
             log_access_attempt(success=True)
 
             next_url = session.pop('next_url', None)
-            return redirect(next_url or url_for(GITHUB_ACCESS_DASHBOARD_ROUTE))
+            return redirect(next_url or _static_url(GITHUB_ACCESS_DASHBOARD_ROUTE))
         else:
             record_failed_attempt(ip)
             error = 'Incorrect password'
@@ -155,15 +180,15 @@ def github_access_login():
 @routes.route('/github-access-check-form', methods=['GET'])
 def github_access_check_form():
     if not session.get('access_granted'):
-        session['next_url'] = url_for('routes.github_access_check_form')
-        return redirect(url_for(GITHUB_ACCESS_LOGIN_ROUTE))
+        session['next_url'] = _static_url('routes.github_access_check_form')
+        return redirect(_static_url(GITHUB_ACCESS_LOGIN_ROUTE))
     return render_template('github-access/github-access-check.html')
 
 @routes.route('/github-access-check', methods=['POST'])
 def github_access_check():
     if not session.get('access_granted'):
-        session['next_url'] = url_for('routes.github_access_check_form')
-        return redirect(url_for(GITHUB_ACCESS_LOGIN_ROUTE))
+        session['next_url'] = _static_url('routes.github_access_check_form')
+        return redirect(_static_url(GITHUB_ACCESS_LOGIN_ROUTE))
 
     username   = request.form.get("username", "").strip()
     org        = request.form.get("organization", "").strip()
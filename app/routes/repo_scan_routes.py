@@ -1,5 +1,6 @@
 # app/routes/repo_scan_routes.py
 import os
+import time
 from typing import Dict, Any, Optional, Tuple
 
 from flask import (
@@ -9,13 +10,18 @@ from flask import (
     send_from_directory,
     current_app,
     url_for,
+    session,
 )
 from flask_wtf.csrf import generate_csrf
 
 from app.routes import routes  # Existing Blueprint
-from app.tasks import create_task, task_statuses
+from app.tasks import create_task, task_statuses, get_task_log
+from app.utils.git_sonar import SonarConfigError
 from app.utils.validators import extract_form_data, validate_request
 
+# Session key for the signed CSRF token handed out by /csrf-token
+_CSRF_CACHE_KEY = "_csrf_token_cache"
+
 # Screenshot directory (inside static/screenshots)
 # Use current_app.root_path at runtime for consistency in container/venv
 
@@ -24,19 +30,25 @@ def _screenshot_dir() -> str:
     return os.path.join(root, "static", "screenshots")
 
 
-def _truncate_log(log_text: Optional[str], max_bytes: int = 50_000) -> Tuple[Optional[str], int]:
+def _truncate_log(
+    log_text: Optional[str],
+    max_bytes: int = 50_000,
+    total: Optional[int] = None,
+) -> Tuple[Optional[str], int]:
     """Returns (log_snippet, total_size).
     - For normal response, we don't send full log to save localStorage/quota.
     - FE will show button if has_log=True, and can request include_log=1 if needed.
+    - Pass precomputed `total` (byte size) to skip re-encoding the whole log.
     """
     if not log_text:
         return None, 0
-    encoded = log_text.encode("utf-8", errors="ignore")
-    total = len(encoded)
+    if total is None:
+        total = len(log_text.encode("utf-8", errors="ignore"))
     if total <= max_bytes:
         return log_text, total
-    # safe cut per byte then decode back
-    truncated = encoded[:max_bytes]
+    # Each char is at least 1 byte, so the first max_bytes chars are enough
+    # to produce a byte-accurate cut without encoding the whole log.
+    truncated = log_text[:max_bytes].encode("utf-8", errors="ignore")[:max_bytes]
     try:
         snippet = truncated.decode("utf-8", errors="ignore")
     except Exception:
@@ -51,14 +63,13 @@ def _shape_screenshot_info(task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     filename = info.get("filename")
     if not filename:
         return None
-    # display_url to static so it can be opened in new tab (see FE expectation)
+    # Worker already stores display_url when the screenshot is saved;
+    # snapshots are never mutated, so the stored dict can be returned as-is.
+    if info.get("display_url"):
+        return info
+    # Compatibility shim for producers that didn't set display_url
     display_url = url_for("static", filename=f"screenshots/{filename}", _external=False)
-    return {
-        "filename": filename,
-        "display_url": display_url,
-        # keep other fields from producer if any
-        **{k: v for k, v in info.items() if k not in {"filename"}},
-    }
+    return {**info, "display_url": display_url}
 
 
 ##########################################
@@ -80,13 +91,17 @@ def repo_scan():
     exclusions = (request.form.get("sonar_exclusions") or "").strip()
     inclusions = (request.form.get("sonar_inclusions") or "").strip()
 
-    task_id = create_task(
-        repo_url,
-        branch_name,
-        project_key,
-        exclusions=exclusions,
-        inclusions=inclusions,
-    )
+    try:
+        task_id = create_task(
+            repo_url,
+            branch_name,
+            project_key,
+            exclusions=exclusions,
+            inclusions=inclusions,
+        )
+    except SonarConfigError as e:
+        current_app.logger.error(f"Repo scan unavailable: {e}")
+        return jsonify({"error": f"Scanner is not configured: {e}"}), 503
 
     return jsonify({
         "message": "Task queued successfully.",
@@ -106,15 +121,23 @@ def task_status_route(task_id):
 
     # Handle log: default DO NOT send full log. FE only needs meta to avoid filling localStorage
     include_log = request.args.get("include_log") == "1"
-    raw_log = task_info.get("log")
+    # Failed tasks only store an exception summary; the text is built on demand.
+    # Byte size is cached by the worker whenever it writes a plain log.
+    raw_log = get_task_log(task_info)
+    log_size = None if task_info.get("_exc") else task_info.get("log_size")
     if include_log:
         # if requested, send log with safe truncation (e.g. 50KB)
-        log_snippet, total_size = _truncate_log(raw_log)
+        log_snippet, total_size = _truncate_log(raw_log, total=log_size)
         log_payload = log_snippet
     else:
         # do not send log body, only meta
         log_payload = None
-        total_size = len(raw_log.encode("utf-8", errors="ignore")) if raw_log else 0
+        if not raw_log:
+            total_size = 0
+        elif log_size is not None:
+            total_size = log_size
+        else:
+            total_size = len(raw_log.encode("utf-8", errors="ignore"))
 
     response = {
         "task_id": task_id,
@@ -158,8 +181,24 @@ def download_screenshot(filename):
 
 @routes.get("/csrf-token")
 def get_csrf_token():
-    """Endpoint to refresh CSRF token (used by FE when idle/expired)."""
-    return jsonify({"csrf_token": generate_csrf()})
+    """Endpoint to refresh CSRF token (used by FE when idle/expired).
+
+    Reuses the signed token stored in the session while it is younger than
+    half of WTF_CSRF_TIME_LIMIT, instead of re-signing on every call.
+    """
+    field_name = current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token")
+    time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    now = int(time.time())
+
+    cached = session.get(_CSRF_CACHE_KEY)
+    if cached and session.get(field_name):
+        age = now - cached.get("issued_at", 0)
+        if time_limit is None or age < time_limit // 2:
+            return jsonify({"csrf_token": cached["token"]})
+
+    token = generate_csrf()
+    session[_CSRF_CACHE_KEY] = {"token": token, "issued_at": now}
+    return jsonify({"csrf_token": token})
 
 
 @routes.get("/ping")
@@ -1,34 +1,32 @@
 # app/utils/task.py
 
 import threading
-import queue
 import uuid
 import logging
-import os
-import traceback
-from datetime import datetime
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict, Any
 
-from app.utils.git_sonar import clone_and_scan, QualityGateFailed
-from app.utils.screenshot_service import take_sonar_screenshot
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
 # Konfigurasi Batas Riwayat Task (Mencegah Memory Leak)
 MAX_TASK_HISTORY = 100 
+# Task yang tidak di-update selama ini ikut dibuang walau history belum penuh
+TASK_HISTORY_TTL_SECONDS = 24 * 60 * 60
 
-# Status task di-memory
-task_statuses: Dict[str, Dict[str, Any]] = {}
+# Status task di-memory, urut LRU: task yang paling lama tidak di-update ada di depan
+task_statuses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# Lindungi insert/evict; popitem() OrderedDict tidak aman bila bersamaan dengan __setitem__
+_status_lock = threading.Lock()
 
-# Antrian job
-task_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
-
-# Worker management
-_worker_started = False
-_worker_lock = threading.Lock()
 # Ambil dari Config
-_num_workers = int(os.getenv("WORKER_CONCURRENCY", "1"))
+_num_workers = Config.WORKER_CONCURRENCY
+
+# Executor menggantikan Queue + worker thread manual (FIFO, thread dibuat saat submit)
+_executor = ThreadPoolExecutor(max_workers=_num_workers, thread_name_prefix="task-worker")
 
 # Area screenshot default (px)
 DEFAULT_CLIP_RECT = {
@@ -41,17 +39,59 @@ DEFAULT_CLIP_RECT = {
 def _cleanup_old_tasks():
     """
     Menghapus task lama jika jumlah task di memori melebihi MAX_TASK_HISTORY.
-    Python 3.7+ dictionary itu ordered, jadi yang pertama masuk = yang pertama dihapus.
+    Pop dari depan OrderedDict: task yang paling lama tidak di-update dihapus duluan,
+    sehingga task yang masih Queued/Running (terus di-update worker) tidak ikut terbuang.
+    Task yang tidak di-update lebih dari TASK_HISTORY_TTL_SECONDS juga dihapus.
+    Caller wajib memegang _status_lock.
+    """
+    removed = 0
+    while len(task_statuses) > MAX_TASK_HISTORY:
+        task_statuses.popitem(last=False)
+        removed += 1
+    # Urut LRU: cukup cek dari depan sampai ketemu task yang masih baru
+    expired_before = time.monotonic() - TASK_HISTORY_TTL_SECONDS
+    while task_statuses and next(iter(task_statuses.values()))["_updated_at"] < expired_before:
+        task_statuses.popitem(last=False)
+        removed += 1
+    if removed:
+        logger.debug(f"Cleaned up {removed} old tasks from memory.")
+
+def _update_task(task_id: str, **fields: Any) -> None:
+    """
+    Ganti snapshot status task secara utuh (copy-on-write).
+    Reader cukup ambil satu referensi via task_statuses.get() tanpa lock,
+    karena dict yang sudah dipublish tidak pernah dimutasi lagi.
+    """
+    if "log" in fields:
+        # Simpan ukuran byte sekali di sini agar status route tidak encode ulang per poll
+        log_text = fields["log"]
+        fields["log_size"] = len(log_text.encode("utf-8", errors="ignore")) if log_text else 0
+
+    with _status_lock:
+        current = task_statuses.get(task_id)
+        if current is None:
+            # Task sudah di-evict dari history, tidak perlu diupdate
+            return
+        task_statuses[task_id] = {**current, **fields, "_updated_at": time.monotonic()}
+        task_statuses.move_to_end(task_id)
+
+def get_task_log(task: Dict[str, Any]) -> Optional[str]:
     """
-    if len(task_statuses) > MAX_TASK_HISTORY:
-        # Hitung berapa yang harus dibuang
-        excess = len(task_statuses) - MAX_TASK_HISTORY
-        keys_to_remove = list(task_statuses.keys())[:excess]
-        for k in keys_to_remove:
-            del task_statuses[k]
-        logger.debug(f"Cleaned up {len(keys_to_remove)} old tasks from memory.")
+    Teks log untuk user. Jika task gagal karena exception, pesan disusun di sini
+    (lazy, hanya saat diminta) dari ringkasan `_exc` yang disimpan worker.
+    """
+    exc = task.get("_exc")
+    if exc:
+        label, exc_type, message = exc
+        return f"{label}: {exc_type}: {message}"
+    return task.get("log")
 
 def _process_job(job: Dict[str, Any]) -> None:
+    # Import di sini (bukan top-level) agar Playwright & kawan-kawan tidak ikut
+    # di-load saat startup; job pertama di worker yang menanggung biayanya.
+    from app.utils.git_sonar import clone_and_scan, shared_workdir_pool, QualityGateFailed
+    from app.utils.screenshot_service import take_sonar_screenshot
+
     task_id: str = job["task_id"]
     repo_url: str = job["repo_url"]
     branch_name: str = job["branch_name"]
@@ -63,8 +103,8 @@ def _process_job(job: Dict[str, Any]) -> None:
     logger.info(f"--- WORKER START: task={task_id} proj={project_key} branch={branch_name} ---")
     
     # Update status awal
-    task_statuses[task_id]["status"] = "Running"
-    
+    _update_task(task_id, status="Running")
+
     sonar_url = None
     final_status = "Completed" # Default jika sukses
     error_msg = None
@@ -75,7 +115,9 @@ def _process_job(job: Dict[str, Any]) -> None:
         sonar_url = clone_and_scan(
             repo_url, branch_name, project_key,
             exclusions=exclusions, inclusions=inclusions,
-            per_job_cache=True
+            per_job_cache=True,
+            # GIT_REUSE_WORKDIRS: clone lama untuk repo yang sama dipakai ulang (None = selalu clone baru)
+            workdirs=shared_workdir_pool(),
         )
 
     except QualityGateFailed as qgf:
@@ -88,55 +130,50 @@ def _process_job(job: Dict[str, Any]) -> None:
 
     except Exception as e:
         # Error fatal (git error, koneksi putus, scanner crash)
-        tb = traceback.format_exc()
-        logger.error(f"--- WORKER ERROR: task={task_id} ---\n{tb}")
-        task_statuses[task_id]["status"] = "Failed: An error occurred"
-        task_statuses[task_id]["log"] = f"Error: {str(e)}\n\n{tb}"
+        # Traceback lengkap cukup ke logger; task hanya simpan ringkasan exception
+        logger.exception(f"--- WORKER ERROR: task={task_id} ---")
+        _update_task(task_id, status="Failed: An error occurred", _exc=("Error", type(e).__name__, str(e)))
         return # STOP di sini, tidak bisa screenshot
 
     # 2. Jalankan Screenshot (Hanya jika kita punya sonar_url)
     if sonar_url:
         try:
-            task_statuses[task_id]["sonar_url"] = sonar_url
-            task_statuses[task_id]["status"] = "Generating Screenshot"
-            
             # Jika Quality Gate gagal, simpan pesan lognya
+            phase = {"sonar_url": sonar_url, "status": "Generating Screenshot"}
             if error_msg:
-                task_statuses[task_id]["log"] = error_msg
+                phase["log"] = error_msg
+            _update_task(task_id, **phase)
 
             screenshot_info = take_sonar_screenshot(project_key, clip_rect=clip_rect)
-            task_statuses[task_id]["screenshot_info"] = screenshot_info
-            
+            if screenshot_info and screenshot_info.get("filename") and not screenshot_info.get("display_url"):
+                # Hitung sekali di sini agar status route tidak perlu url_for per poll
+                screenshot_info["display_url"] = f"/static/screenshots/{screenshot_info['filename']}"
+
             # Set status akhir (Completed atau Failed: Quality Gate)
-            task_statuses[task_id]["status"] = final_status
+            _update_task(task_id, screenshot_info=screenshot_info, status=final_status)
             logger.info(f"--- WORKER DONE: task={task_id} status={final_status} ---")
             
         except Exception as e:
-            tb = traceback.format_exc()
-            logger.error(f"--- SCREENSHOT ERROR: task={task_id} ---\n{tb}")
-            task_statuses[task_id]["status"] = "Failed: Screenshot Error"
-            task_statuses[task_id]["log"] = f"Scan success but screenshot failed: {str(e)}\n\n{tb}"
-
-
-def _worker_loop() -> None:
-    while True:
-        job = task_queue.get()  # blocking wait
-        try:
-            _process_job(job)
-        finally:
-            task_queue.task_done()
-
-
-def _ensure_workers_started() -> None:
-    global _worker_started
-    with _worker_lock:
-        if _worker_started:
-            return
-        for i in range(_num_workers):
-            t = threading.Thread(target=_worker_loop, name=f"task-worker-{i+1}", daemon=True)
-            t.start()
-        _worker_started = True
-        logger.info("Task queue workers started: %d worker(s).", _num_workers)
+            logger.exception(f"--- SCREENSHOT ERROR: task={task_id} ---")
+            _update_task(
+                task_id,
+                status="Failed: Screenshot Error",
+                _exc=("Scan success but screenshot failed", type(e).__name__, str(e)),
+            )
+
+
+def _log_job_exception(task_id: str, fut: Future) -> None:
+    # _process_job sudah menangani error scan/screenshot; ini jaring pengaman
+    # agar exception tak terduga tidak hilang diam-diam di dalam Future.
+    if fut.cancelled():
+        # fut.exception() akan raise CancelledError untuk Future yang di-cancel
+        logger.info(f"Task {task_id} cancelled before it started.")
+        _update_task(task_id, status="Failed: Cancelled")
+        return
+    exc = fut.exception()
+    if exc is not None:
+        logger.error(f"--- WORKER CRASH: task={task_id} ---", exc_info=exc)
+        _update_task(task_id, status="Failed: An error occurred", _exc=("Error", type(exc).__name__, str(exc)))
 
 
 def create_task(
@@ -149,26 +186,34 @@ def create_task(
 ) -> str:
     """
     Enqueue task ke antrian (FIFO).
+    Raise SonarConfigError sebelum task dibuat jika config Sonar tidak lengkap,
+    bukan gagal di worker setelah clone.
     """
-    _ensure_workers_started()
-    
-    # BERSIHKAN MEMORY DULU SEBELUM NAMBAH TASK BARU
-    _cleanup_old_tasks()
-
-    task_id = str(uuid.uuid4())
-    
-    # Struktur data status awal
-    task_statuses[task_id] = {
-        "task_id": task_id,
-        "created_at": datetime.now().isoformat(),
-        "status": "Queued",
-        "repo_url": repo_url,
-        "branch_name": branch_name,
-        "project_key": project_key,
-        "sonar_url": None,
-        "screenshot_info": None,
-        "log": None,
-    }
+    from app.utils.git_sonar import validate_sonar_config
+    validate_sonar_config()
+
+    task_id = uuid.uuid4().hex
+
+    with _status_lock:
+        # BERSIHKAN MEMORY DULU SEBELUM NAMBAH TASK BARU
+        _cleanup_old_tasks()
+
+        # Struktur data status awal
+        task_statuses[task_id] = {
+            "task_id": task_id,
+            # Epoch nanodetik; format ke ISO hanya jika nanti dibutuhkan FE
+            "created_at": time.time_ns(),
+            "status": "Queued",
+            "repo_url": repo_url,
+            "branch_name": branch_name,
+            "project_key": project_key,
+            "sonar_url": None,
+            "screenshot_info": None,
+            "log": None,
+            "log_size": 0,
+            # Internal (monotonic), untuk TTL history
+            "_updated_at": time.monotonic(),
+        }
 
     job = {
         "task_id": task_id,
@@ -180,6 +225,9 @@ def create_task(
         "clip_rect": clip_rect or DEFAULT_CLIP_RECT,
     }
 
-    task_queue.put(job)
+    fut = _executor.submit(_process_job, job)
+    # Future disimpan (internal, tidak dikirim ke FE) agar task bisa di-cancel / ditunggu
+    _update_task(task_id, _future=fut)
+    fut.add_done_callback(lambda f: _log_job_exception(task_id, f))
     logger.info(f"Task {task_id} enqueued: repo={repo_url} branch={branch_name}")
     return task_id
\ No newline at end of file
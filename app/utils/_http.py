@@ -0,0 +1,41 @@
+# app/utils/_http.py
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Ukuran pool >= jumlah thread paralel terbesar yang memanggil GitHub
+# (pagination, permission checker, add collaborator) agar tidak muncul "pool is full".
+GITHUB_POOL_SIZE = 32
+
+# Hanya 5xx sementara yang dicoba ulang, dengan backoff pendek: 3 retry x factor 0.5
+# = jeda maks 2 detik per retry (backoff_max tidak dipakai, hanya ada di urllib3 2.x).
+# Session ini dipakai route Flask yang sinkron: rate limit (429/403) tidak di-retry
+# dan Retry-After tidak dihormati, agar worker waitress tidak tertahan bermenit-menit;
+# status 429 langsung dikembalikan ke caller.
+# raise_on_status=False: setelah retry habis, response terakhir tetap dikembalikan
+# sehingga caller tetap bisa membaca status code seperti sebelumnya.
+_GITHUB_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset(["GET", "PUT"]),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+
+def _build_github_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=GITHUB_POOL_SIZE,
+        pool_maxsize=GITHUB_POOL_SIZE,
+        max_retries=_GITHUB_RETRY,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Session bersama untuk semua call GitHub API (keep-alive + retry), dibuat sekali per proses
+GITHUB_SESSION = _build_github_session()
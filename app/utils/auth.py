@@ -1,64 +1,123 @@
-import os
 import hmac
-from flask import request
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
+import logging
+import threading
+import time
+from flask import request, g
 
-load_dotenv()
+# app.config sudah memanggil load_dotenv(); .env cukup dibaca sekali per proses
+from app.config import Config
+
+# Dibaca sekali saat import; tidak perlu os.getenv di setiap percobaan login
+_EXPECTED_PASSWORD = (Config.GITHUB_ACCESS_PASSWORD or "").strip().encode("utf-8")
+
+_NS_PER_SEC = 1_000_000_000
 
-_failed_attempts = {}
 MAX_ATTEMPTS = 5
-BLOCK_DURATION = timedelta(minutes=1)
+# Durasi dalam nanodetik monotonic (kebal terhadap lompatan jam sistem)
+BLOCK_DURATION_NS = 60 * _NS_PER_SEC
+# Entry yang tidak sedang diblokir & gagal terakhir lebih lama dari ini akan dibuang
+STALE_AFTER_NS = 15 * 60 * _NS_PER_SEC
+# Sweep dijalankan setiap N kali record_failed_attempt
+_SWEEP_EVERY = 256
+
+
+class _Attempt:
+    __slots__ = ("count", "last_failed_at", "blocked_until")
+
+    def __init__(self):
+        self.count = 0
+        self.last_failed_at = 0   # time.monotonic_ns(), 0 = belum pernah
+        self.blocked_until = 0    # time.monotonic_ns(), 0 = tidak diblokir
+
+    def reset(self):
+        self.count = 0
+        self.last_failed_at = 0
+        self.blocked_until = 0
+
+
+_failed_attempts = {}
+_record_calls = 0
+# Dipakai bersama oleh semua thread waitress: insert, counter & sweep harus atomik
+_attempts_lock = threading.Lock()
+
+_access_logger = logging.getLogger("github_access")
 
 def get_client_ip():
-    if request.headers.get('X-Forwarded-For'):
-        return request.headers.get('X-Forwarded-For').split(',')[0]
-    return request.remote_addr or 'unknown'
+    # Di-cache per request: login handler memanggil ini beberapa kali per POST
+    cached = getattr(g, '_client_ip', None)
+    if cached is not None:
+        return cached
+
+    xff = request.headers.get('X-Forwarded-For')
+    if xff:
+        ip, _, _ = xff.partition(',')
+        ip = ip.strip() or 'unknown'
+    else:
+        ip = request.remote_addr or 'unknown'
+
+    g._client_ip = ip
+    return ip
 
 def validate_github_access_password(input_password: str) -> bool:
-    expected_password = (os.getenv("GITHUB_ACCESS_PASSWORD") or "").strip()
-    if not expected_password:
+    if not _EXPECTED_PASSWORD:
         return False
-    return hmac.compare_digest(input_password or "", expected_password)
+    return hmac.compare_digest((input_password or "").encode("utf-8"), _EXPECTED_PASSWORD)
 
 def is_access_password_configured() -> bool:
-    return bool((os.getenv("GITHUB_ACCESS_PASSWORD") or "").strip())
+    return bool(_EXPECTED_PASSWORD)
 
 def is_ip_blocked(ip: str) -> bool:
-    entry = _failed_attempts.get(ip)
-    if not entry:
-        return False
+    with _attempts_lock:
+        entry = _failed_attempts.get(ip)
+        if not entry:
+            return False
+
+        blocked_until = entry.blocked_until
+        if not blocked_until:
+            return False
+        if time.monotonic_ns() < blocked_until:
+            return True
 
-    blocked_until = entry.get("blocked_until")
-    if blocked_until and datetime.utcnow() < blocked_until:
-        return True
+        # Jika sudah lewat waktu blokir, reset percobaan
+        entry.reset()
+        return False
 
-    # Jika sudah lewat waktu blokir, reset percobaan
-    if blocked_until and datetime.utcnow() >= blocked_until:
-        _failed_attempts[ip] = {"count": 0, "last_failed_at": None, "blocked_until": None}
-    return False
+def _sweep_failed_attempts(now: int):
+    """
+    Buang entry yang sudah tidak relevan agar dict tidak tumbuh tanpa batas.
+    Caller wajib memegang _attempts_lock.
+    """
+    stale = [
+        ip for ip, entry in _failed_attempts.items()
+        if entry.blocked_until <= now and now - entry.last_failed_at > STALE_AFTER_NS
+    ]
+    for ip in stale:
+        _failed_attempts.pop(ip, None)
 
 def record_failed_attempt(ip: str):
-    now = datetime.utcnow()
-    entry = _failed_attempts.get(ip, {"count": 0, "last_failed_at": None, "blocked_until": None})
-    entry["count"] += 1
-    entry["last_failed_at"] = now
+    global _record_calls
+    now = time.monotonic_ns()
+
+    with _attempts_lock:
+        _record_calls += 1
+        if _record_calls % _SWEEP_EVERY == 0:
+            _sweep_failed_attempts(now)
 
-    if entry["count"] >= MAX_ATTEMPTS:
-        entry["blocked_until"] = now + BLOCK_DURATION
+        entry = _failed_attempts.get(ip)
+        if entry is None:
+            entry = _failed_attempts[ip] = _Attempt()
+        entry.count += 1
+        entry.last_failed_at = now
 
-    _failed_attempts[ip] = entry
+        if entry.count >= MAX_ATTEMPTS:
+            entry.blocked_until = now + BLOCK_DURATION_NS
 
 def reset_failed_attempts(ip: str):
-    if ip in _failed_attempts:
-        _failed_attempts[ip] = {"count": 0, "last_failed_at": None, "blocked_until": None}
+    with _attempts_lock:
+        entry = _failed_attempts.get(ip)
+        if entry is not None:
+            entry.reset()
 
 def log_access_attempt(success: bool):
-    ip = get_client_ip()
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    status = "SUCCESS" if success else "FAILED"
-    log_line = f"[{now}] [{ip}] Login attempt: {status}\n"
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    with open(os.path.join(log_dir, "github_access.log"), "a") as f:
-        f.write(log_line)
+    # Handler file (rotating) dipasang sekali di configure_logging()
+    _access_logger.info("[%s] Login attempt: %s", get_client_ip(), "SUCCESS" if success else "FAILED")
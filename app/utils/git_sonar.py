@@ -1,16 +1,24 @@
 # app/utils/git_sonar.py
 
+import atexit
 import os
 import re
+import fcntl
+import functools
+import hashlib
 import subprocess
 import tempfile
 import shutil
 import logging
-import queue
+import mmap
 import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from concurrent.futures import Future
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from types import MappingProxyType
+from typing import Iterator, List, Dict, Any, Iterable, Mapping, Optional, Tuple
 
 from app.config import Config
 
@@ -29,6 +37,10 @@ class QualityGateFailed(Exception):
         self.url = url
 
 
+class SonarConfigError(RuntimeError):
+    """Konfigurasi SonarQube (SONAR_HOST_URL / SONAR_LOGIN_TOKEN) tidak lengkap."""
+
+
 # Detect common token leaks in repo URL (prevent future incidents)
 _TOKEN_PATTERNS = [
     r"ghp_[A-Za-z0-9]{20,}",
@@ -38,81 +50,419 @@ _TOKEN_PATTERNS = [
     r"ghs_[A-Za-z0-9]{20,}",
     r"ghr_[A-Za-z0-9]{20,}",
 ]
+_TOKEN_RE = re.compile("|".join(f"(?:{p})" for p in _TOKEN_PATTERNS))
 
 
 def _looks_like_credentialed_url(repo_url: str) -> bool:
     # URL basic-auth usually contains "@"
-    if "@" in repo_url:
-        return True
-    for pat in _TOKEN_PATTERNS:
-        if re.search(pat, repo_url):
-            return True
-    return False
+    return "@" in repo_url or _TOKEN_RE.search(repo_url) is not None
 
 
+@functools.lru_cache(maxsize=1)
 def _git_env() -> Dict[str, str]:
     """
     Pastikan git tidak meminta input interaktif.
     Git akan otomatis mencari .netrc di $HOME/.netrc (default behavior).
+    Dibangun sekali per proses; caller tidak boleh memodifikasi dict ini.
     """
     env = os.environ.copy()
     env["GIT_TERMINAL_PROMPT"] = "0"
     return env
 
 
+def _git_base_cmd() -> List[str]:
+    # Matikan helper lain, paksa baca config/netrc
+    return ["git", "-c", "credential.helper="]
+
+
+def _git_transfer_opts() -> List[str]:
+    """Opsi transfer tambahan (protocol v2 + negotiation 'skipping') bila partial clone aktif."""
+    if not Config.GIT_PARTIAL_CLONE:
+        return []
+    return ["-c", "protocol.version=2", "-c", "fetch.negotiationAlgorithm=skipping"]
+
+
+def _submodule_jobs() -> int:
+    return min(8, os.cpu_count() or 4)
+
+
+def _git_submodule_opts() -> List[str]:
+    """`-c submodule.fetchJobs=N` untuk invocation git utama bila submodule ikut di-clone."""
+    if not Config.GIT_RECURSE_SUBMODULES:
+        return []
+    return ["-c", f"submodule.fetchJobs={_submodule_jobs()}"]
+
+
+def _run_git(cmd: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_git_env(),
+    )
+
+
+def _raise_git_failure(repo_url: str, e: subprocess.CalledProcessError) -> None:
+    stderr = (e.stderr or "").strip()
+    stdout = (e.stdout or "").strip()
+    detail = stderr or stdout or "unknown git error"
+    hint = ""
+    if "could not read Username" in detail:
+        hint = "Check .netrc in HOME and its permissions (600)."
+        detail = f"{detail}. {hint}"
+
+    logger.error("Git operation failed for %s. Detail: %s", repo_url, detail)
+    raise RuntimeError(f"Git operation failed: {detail}") from e
+
+
+# --- Bare repo cache (git-cache/<repo>-<hash>.git) ---
+# Repo yang sama cukup di-fetch delta-nya, lalu checkout via `git worktree`.
+_worktree_owners: Dict[str, str] = {}
+_worktree_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=512)
+def _make_dir(path: str) -> str:
+    os.makedirs(path, exist_ok=True)
+    return os.path.realpath(path)
+
+
+def _ensure_dir(path: str) -> str:
+    """
+    makedirs sekali per path per proses (scan berikutnya tidak perlu stat/mkdir lagi).
+    Path dinormalisasi dulu agar bentuk yang setara memakai slot cache yang sama.
+    Return path realpath. Direktori yang dihapus manual saat proses jalan tidak dibuat ulang.
+    """
+    return _make_dir(os.path.abspath(path))
+
+
+def _git_cache_root() -> str:
+    return os.path.join(_get_sonar_config()["cache_dir"], "git-cache")
+
+
+def _cache_key(repo_url: str) -> str:
+    normalized = repo_url.strip().rstrip("/")
+    if normalized.endswith(".git"):
+        normalized = normalized[:-4]
+    normalized = normalized.lower()
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    name = re.sub(r"[^a-z0-9._-]+", "_", "_".join(normalized.split("/")[-2:]))
+    return f"{name}-{digest}.git"
+
+
+def _ensure_bare_cache(repo_url: str) -> str:
+    """
+    Siapkan bare repo untuk repo_url (sekali). Caller wajib memegang lock cache.
+    """
+    cache_path = os.path.join(_git_cache_root(), _cache_key(repo_url))
+    if os.path.isdir(cache_path):
+        return cache_path
+
+    logger.info("Creating bare repo cache for %s at %s", repo_url, cache_path)
+    try:
+        _run_git(_git_base_cmd() + ["init", "--quiet", "--bare", cache_path])
+        _run_git(_git_base_cmd() + ["-C", cache_path, "remote", "add", "origin", "--", repo_url])
+    except subprocess.CalledProcessError:
+        shutil.rmtree(cache_path, ignore_errors=True)
+        raise
+    return cache_path
+
+
+@contextmanager
+def _repo_cache_lock(repo_url: str) -> Iterator[None]:
+    """
+    Serialisasi antar worker (thread maupun proses) untuk repo yang sama:
+    FETCH_HEAD, object store & file shallow di bare repo dipakai bersama.
+    """
+    _ensure_dir(_git_cache_root())
+    lock_path = os.path.join(_git_cache_root(), _cache_key(repo_url) + ".lock")
+    with _acquire_lock_file(lock_path, blocking=True):
+        yield
+
+
+@contextmanager
+def _acquire_lock_file(lock_path: str, blocking: bool) -> Iterator[bool]:
+    """
+    flock pada lock_path; yield False jika non-blocking dan sedang dipegang worker lain.
+    File lock bisa dihapus saat eviction, jadi setelah flock dipastikan inode-nya
+    masih file yang sama dengan path (jika tidak, ulangi dengan file baru).
+    """
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    while True:
+        lock_file = open(lock_path, "a")
+        try:
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                same_file = os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if not same_file:
+                continue
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return
+        finally:
+            lock_file.close()
+
+
+# Eviction bare repo cache yang tidak dipakai > GIT_REPO_CACHE_MAX_AGE_DAYS,
+# dicek paling sering sekali per interval ini
+_CACHE_EVICT_INTERVAL_SECONDS = 60 * 60
+_last_cache_evict: Optional[float] = None
+_cache_evict_lock = threading.Lock()
+
+
+def _evict_stale_repo_caches() -> None:
+    """
+    Hapus bare repo (beserta file lock-nya) yang mtime-nya lebih tua dari batas umur.
+    mtime di-touch setiap kali cache dipakai; repo yang sedang di-lock worker lain dilewati.
+    """
+    global _last_cache_evict
+    max_age_days = Config.GIT_REPO_CACHE_MAX_AGE_DAYS
+    if max_age_days <= 0:
+        return
+    now = time.monotonic()
+    if _last_cache_evict is not None and now - _last_cache_evict < _CACHE_EVICT_INTERVAL_SECONDS:
+        return
+    if not _cache_evict_lock.acquire(blocking=False):
+        return
+    try:
+        _last_cache_evict = now
+        root = _git_cache_root()
+        expired_before = time.time() - max_age_days * 24 * 60 * 60
+        try:
+            entries = [e for e in os.scandir(root) if e.name.endswith(".git") and e.is_dir()]
+        except FileNotFoundError:
+            return
+        with _worktree_lock:
+            in_use = set(_worktree_owners.values())
+        for entry in entries:
+            # Masih punya worktree aktif di proses ini (misal di pool workdir)
+            if os.path.realpath(entry.path) in in_use or entry.path in in_use:
+                continue
+            try:
+                if entry.stat().st_mtime >= expired_before:
+                    continue
+            except FileNotFoundError:
+                continue
+            lock_path = entry.path + ".lock"
+            with _acquire_lock_file(lock_path, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                # Cek ulang di bawah lock: bisa saja baru dipakai
+                try:
+                    if os.stat(entry.path).st_mtime >= expired_before:
+                        continue
+                except FileNotFoundError:
+                    continue
+                logger.info("Evicting stale git cache %s", entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+                try:
+                    os.unlink(lock_path)
+                except FileNotFoundError:
+                    pass
+    finally:
+        _cache_evict_lock.release()
+
+
+def _cached_clone(repo_url: str, branch_name: str, tmp_dir: str) -> None:
+    with _repo_cache_lock(repo_url):
+        cache_path = _ensure_bare_cache(repo_url)
+        _run_git(_git_base_cmd() + _git_transfer_opts() + [
+            "-C", cache_path, "fetch", "--quiet", "--depth=1", "--no-tags", "origin", branch_name,
+        ])
+        _run_git(_git_base_cmd() + [
+            "-C", cache_path, "worktree", "add", "--quiet", "--detach", tmp_dir, "FETCH_HEAD",
+        ])
+        # Tandai cache masih dipakai (acuan eviction)
+        os.utime(cache_path)
+
+    # Daftarkan segera agar kegagalan langkah berikutnya dibersihkan via remove_clone
+    # (worktree remove), bukan sekadar rmtree yang meninggalkan registrasi worktree
+    with _worktree_lock:
+        _worktree_owners[tmp_dir] = cache_path
+
+    if Config.GIT_RECURSE_SUBMODULES:
+        # Submodule di-clone ke worktree ini saja (tidak ikut cache), paralel & shallow
+        _run_git(_git_base_cmd() + _git_transfer_opts() + _git_submodule_opts() + [
+            "-C", tmp_dir, "submodule", "update", "--quiet", "--init", "--recursive",
+            "--depth", "1", "--jobs", str(_submodule_jobs()),
+        ])
+
+
+def _plain_clone(repo_url: str, branch_name: str, tmp_dir: str) -> None:
+    cmd = _git_base_cmd() + _git_transfer_opts() + _git_submodule_opts() + [
+        "clone",
+        "--quiet",
+        "--depth", "1",
+        "--single-branch",
+        "--no-tags",
+    ]
+    if Config.GIT_RECURSE_SUBMODULES:
+        cmd += ["--recurse-submodules", "--shallow-submodules", "-j", str(_submodule_jobs())]
+    if Config.GIT_PARTIAL_CLONE:
+        # Blob hanya diunduh untuk file yang di-checkout (butuh dukungan server, GitHub OK)
+        cmd.append("--filter=blob:none")
+    cmd += [
+        "--branch", branch_name,
+        "--", # Security: prevent argument injection
+        repo_url,
+        tmp_dir,
+    ]
+    _run_git(cmd)
+
+
 def limited_clone(repo_url: str, branch_name: str) -> str:
     """
     Clone repo ke direktori sementara.
+    Dengan GIT_REPO_CACHE aktif, direktori ini adalah worktree dari bare repo cache.
     Auth murni mengandalkan ~/.netrc di folder user.
     """
     if _looks_like_credentialed_url(repo_url):
         raise ValueError("repo_url contains credential/token. Use clean https URL and rely on .netrc.")
+    if branch_name.startswith("-"):
+        raise ValueError("Invalid branch name.")
 
     tmp_dir = tempfile.mkdtemp()
     logger.info("Cloning %s into %s", repo_url, tmp_dir)
 
     try:
-        cmd = [
-            "git",
-            "-c", "credential.helper=", # Matikan helper lain, paksa baca config/netrc
-            "clone",
-            "--quiet",
-            "--depth", "1",
-            "--branch", branch_name,
-            "--", # Security: prevent argument injection
-            repo_url,
-            tmp_dir,
-        ]
-
-        subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True,
-            env=_git_env(),
-        )
+        if Config.GIT_REPO_CACHE:
+            _evict_stale_repo_caches()
+            _cached_clone(repo_url, branch_name, tmp_dir)
+        else:
+            _plain_clone(repo_url, branch_name, tmp_dir)
 
         logger.info("Clone successful (branch=%s).", branch_name)
         return tmp_dir
 
     except subprocess.CalledProcessError as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+        remove_clone(tmp_dir)
+        _raise_git_failure(repo_url, e)
+
+
+def remove_clone(tmp_dir: str) -> None:
+    """
+    Hapus direktori hasil limited_clone (worktree atau clone biasa).
+    """
+    with _worktree_lock:
+        cache_path = _worktree_owners.pop(tmp_dir, None)
+
+    if cache_path:
+        try:
+            _run_git(["git", "-C", cache_path, "worktree", "remove", "--force", tmp_dir])
+        except subprocess.CalledProcessError as e:
+            logger.warning("git worktree remove failed for %s: %s", tmp_dir, (e.stderr or "").strip())
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            subprocess.run(["git", "-C", cache_path, "worktree", "prune"], capture_output=True, env=_git_env())
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def refresh_clone(repo_url: str, branch_name: str, tmp_dir: str) -> None:
+    """
+    Pakai ulang direktori hasil limited_clone untuk branch lain (fetch + reset + clean)
+    alih-alih clone dari nol. Raise RuntimeError jika gagal; caller sebaiknya clone ulang.
+    """
+    if branch_name.startswith("-"):
+        raise ValueError("Invalid branch name.")
+
+    with _worktree_lock:
+        is_worktree = tmp_dir in _worktree_owners
+
+    steps = [
+        _git_transfer_opts() + _git_submodule_opts() + [
+            "-C", tmp_dir, "fetch", "--quiet", "--depth=1", "--no-tags", "origin", branch_name,
+        ],
+        ["-C", tmp_dir, "reset", "--quiet", "--hard", "FETCH_HEAD"],
+        # -ff: ikut hapus repo git bersarang; -x: termasuk file ignored (.scannerwork, build output)
+        ["-C", tmp_dir, "clean", "-ffdxq"],
+    ]
+    if Config.GIT_RECURSE_SUBMODULES:
+        steps.append(_git_submodule_opts() + [
+            "-C", tmp_dir, "submodule", "update", "--quiet", "--init", "--recursive",
+            "--depth", "1", "--jobs", str(_submodule_jobs()),
+        ])
+
+    logger.info("Reusing workdir %s for %s (branch=%s)", tmp_dir, repo_url, branch_name)
+    try:
+        if is_worktree:
+            # Worktree berbagi object store dengan bare cache -> pegang lock yang sama
+            with _repo_cache_lock(repo_url):
+                for step in steps:
+                    _run_git(_git_base_cmd() + step)
+        else:
+            for step in steps:
+                _run_git(_git_base_cmd() + step)
+    except subprocess.CalledProcessError as e:
+        _raise_git_failure(repo_url, e)
+
+
+class _WorkdirPool:
+    """
+    LRU direktori clone per repo_url yang disimpan antar job (maks `capacity`).
+    Satu entry hanya dipakai satu job dalam satu waktu (take() mengeluarkannya dari pool).
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._dirs: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, repo_url: str) -> Optional[str]:
+        with self._lock:
+            return self._dirs.pop(repo_url, None)
+
+    def put(self, repo_url: str, tmp_dir: str) -> bool:
+        """Simpan tmp_dir; False jika slot repo sudah terisi (caller yang menghapus)."""
+        evicted = []
+        with self._lock:
+            if repo_url in self._dirs:
+                return False
+            self._dirs[repo_url] = tmp_dir
+            while len(self._dirs) > self._capacity:
+                evicted.append(self._dirs.popitem(last=False)[1])
+        for old_dir in evicted:
+            remove_clone(old_dir)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            dirs, self._dirs = list(self._dirs.values()), OrderedDict()
+        for tmp_dir in dirs:
+            remove_clone(tmp_dir)
 
-        stderr = (e.stderr or "").strip()
-        stdout = (e.stdout or "").strip()
-        detail = stderr or stdout or "unknown git error"
-        hint = ""
-        if "could not read Username" in detail:
-            hint = "Check .netrc in HOME and its permissions (600)."
-            detail = f"{detail}. {hint}"
 
-        logger.error("Git operation failed for %s. Detail: %s", repo_url, detail)
-        raise RuntimeError(f"Git operation failed: {detail}") from e
+_shared_workdirs: Optional[_WorkdirPool] = None
+_shared_workdirs_lock = threading.Lock()
 
 
+def shared_workdir_pool() -> Optional[_WorkdirPool]:
+    """
+    Pool workdir bersama untuk job dari app/tasks.py (dibuat saat pertama dipakai).
+    None jika GIT_REUSE_WORKDIRS mati. Workdir tersisa dihapus saat proses berhenti.
+    """
+    global _shared_workdirs
+    if not Config.GIT_REUSE_WORKDIRS:
+        return None
+    with _shared_workdirs_lock:
+        if _shared_workdirs is None:
+            _shared_workdirs = _WorkdirPool(Config.GIT_REUSE_WORKDIRS_MAX)
+            atexit.register(_shared_workdirs.clear)
+        return _shared_workdirs
+
+
+@functools.lru_cache(maxsize=1)
 def _get_sonar_config() -> Dict[str, Any]:
     """
     [HELPER] Mengumpulkan semua konfigurasi dari Config class.
+    Nilainya statis selama proses hidup, jadi cukup dibangun sekali (jangan dimodifikasi).
     """
     return {
         "host_url": Config.SONAR_HOST_URL,
@@ -125,24 +475,93 @@ def _get_sonar_config() -> Dict[str, Any]:
         "default_exclusions": Config.SONAR_EXCLUSIONS,
         "cpd_min_tokens": Config.SONAR_CPD_MINIMUM_TOKENS,
         "sonar_debug": Config.SONAR_DEBUG,
+        "prefer_shm": Config.SONAR_PREFER_SHM,
     }
 
 
-def _append_coverage_args(cmd: List[str], tmp_dir: str) -> None:
-    coverage_paths = {
-        "python": ("-Dsonar.python.coverage.reportPaths=", "coverage.xml"),
-        "java": ("-Dsonar.coverage.jacoco.xmlReportPaths=", "target/site/jacoco/jacoco.xml"),
-        "javascript": ("-Dsonar.javascript.lcov.reportPaths=", "coverage/lcov.info"),
-        "go": ("-Dsonar.go.coverage.reportPaths=", "coverage.out"),
-    }
+def _validate_sonar_config(config: Dict[str, Any]) -> None:
+    """Gagal cepat (saat task dibuat / queue dibuat) daripada crash di tengah job worker."""
+    if not (config.get("host_url") or "").strip():
+        raise SonarConfigError("Missing SONAR_HOST_URL")
+    if not (config.get("login_token") or "").strip():
+        raise SonarConfigError("Missing SONAR_LOGIN_TOKEN (required).")
 
-    for lang, (param, path) in coverage_paths.items():
-        if os.path.exists(os.path.join(tmp_dir, path)):
-            logger.info("Found %s coverage report, adding to scanner command.", lang)
-            cmd.append(f"{param}{path}")
-            if lang == "java" and os.path.exists(os.path.join(tmp_dir, "target/classes")):
-                cmd.append("-Dsonar.java.binaries=target/classes")
-            return
+
+def validate_sonar_config() -> None:
+    """Validasi config Sonar proses ini; raise SonarConfigError jika tidak lengkap."""
+    _validate_sonar_config(_get_sonar_config())
+
+
+_SHM_DIR = "/dev/shm"
+# Hanya pakai tmpfs jika ruang kosongnya cukup untuk plugin & cache analyzer
+_SHM_MIN_FREE_BYTES = 2 * 1024 ** 3
+
+
+def _pick_cache_root(config: Dict[str, Any]) -> str:
+    """/dev/shm (tmpfs) jika writable & cukup ruang, selain itu cache_dir di disk."""
+    try:
+        if os.access(_SHM_DIR, os.W_OK) and shutil.disk_usage(_SHM_DIR).free > _SHM_MIN_FREE_BYTES:
+            return _SHM_DIR
+    except OSError:
+        pass
+    return config["cache_dir"]
+
+
+def _shm_cache_dir(config: Dict[str, Any], project_key: str) -> Optional[str]:
+    """
+    Buat direktori cache scanner khusus job ini di tmpfs bila SONAR_PREFER_SHM aktif.
+    Return None jika fitur mati atau /dev/shm tidak bisa dipakai (fallback ke disk).
+    Direktori unik per job (scan paralel dengan key sama tidak berbagi) dan memakan RAM,
+    jadi caller wajib menghapusnya setelah scan selesai.
+    """
+    if not config.get("prefer_shm"):
+        return None
+    root = _pick_cache_root(config)
+    if root != _SHM_DIR:
+        logger.info("Scanner cache backend: disk (%s); /dev/shm not usable.", root)
+        return None
+    try:
+        cache_dir = tempfile.mkdtemp(prefix=f"sonar-{project_key.replace('/', '_')}-", dir=root)
+    except OSError as e:
+        logger.info("Scanner cache backend: disk; cannot create dir in %s: %s", root, e)
+        return None
+    logger.info("Scanner cache backend: tmpfs (%s)", cache_dir)
+    return cache_dir
+
+
+# (bahasa, parameter scanner, path report relatif ke root repo) — urutan = prioritas
+_COVERAGE_SPECS: Tuple[Tuple[str, str, str], ...] = (
+    ("python", "-Dsonar.python.coverage.reportPaths=", "coverage.xml"),
+    ("java", "-Dsonar.coverage.jacoco.xmlReportPaths=", "target/site/jacoco/jacoco.xml"),
+    ("javascript", "-Dsonar.javascript.lcov.reportPaths=", "coverage/lcov.info"),
+    ("go", "-Dsonar.go.coverage.reportPaths=", "coverage.out"),
+)
+
+
+def _top_level_entries(tmp_dir: str) -> set:
+    """Nama entry di root repo dalam satu os.scandir (bukan stat per kandidat)."""
+    try:
+        with os.scandir(tmp_dir) as it:
+            return {entry.name for entry in it}
+    except OSError:
+        return set()
+
+
+def _append_coverage_args(cmd: List[str], tmp_dir: str) -> None:
+    top_level = _top_level_entries(tmp_dir)
+
+    for lang, param, path in _COVERAGE_SPECS:
+        head, sep, _ = path.partition("/")
+        if head not in top_level:
+            continue
+        # Path bertingkat baru di-stat jika direktori induknya memang ada
+        if sep and not os.path.exists(os.path.join(tmp_dir, path)):
+            continue
+        logger.info("Found %s coverage report, adding to scanner command.", lang)
+        cmd.append(f"{param}{path}")
+        if lang == "java" and os.path.isdir(os.path.join(tmp_dir, "target/classes")):
+            cmd.append("-Dsonar.java.binaries=target/classes")
+        return
 
     logger.warning("No coverage report found. Skipping coverage metrics.")
 
@@ -193,14 +612,25 @@ def _build_sonar_command(
     return cmd
 
 
+@functools.lru_cache(maxsize=4)
+def _base_scanner_env(heap_min: str, heap_max: str) -> Mapping[str, str]:
+    """Template env scanner (os.environ + entry statis); per job hanya tambah SONAR_USER_HOME/TOKEN."""
+    env = os.environ.copy()
+    env["SONAR_SCANNER_OPTS"] = f"{heap_min} {heap_max}"
+    return MappingProxyType(env)
+
+
 def _build_scanner_env(
     config: Dict[str, Any],
-    custom_cache_dir: Optional[str]
+    custom_cache_dir: Optional[str],
+    project_key: Optional[str] = None
 ) -> Tuple[Dict[str, str], str]:
-    env = os.environ.copy()
-    env["SONAR_SCANNER_OPTS"] = f"{config['heap_min']} {config['heap_max']}"
+    # Salin dari template (dict biasa) — lebih murah dari os.environ.copy() per scan
+    env = dict(_base_scanner_env(config["heap_min"], config["heap_max"]))
 
-    final_cache_dir = custom_cache_dir if custom_cache_dir else config["cache_dir"]
+    # tmpfs hanya untuk cache per job (clone_and_scan per_job_cache=True, yang juga menghapusnya);
+    # tanpa custom_cache_dir dipakai cache bersama di disk
+    final_cache_dir = custom_cache_dir or config["cache_dir"]
     env["SONAR_USER_HOME"] = final_cache_dir
 
     token = (config.get("login_token") or "").strip()
@@ -208,36 +638,43 @@ def _build_scanner_env(
         raise RuntimeError("Missing SONAR_LOGIN_TOKEN (required).")
     env["SONAR_TOKEN"] = token
 
-    os.makedirs(final_cache_dir, exist_ok=True)
-    return env, final_cache_dir
+    return env, _ensure_dir(final_cache_dir)
 
 
-def _apply_nice(nice_adj: int) -> None:
-    try:
-        os.nice(nice_adj)
-    except Exception:
-        pass
+_AFFINITY_RE = re.compile(r"^\d+(-\d+)?(,\d+(-\d+)?)*$")
 
 
-def _apply_affinity(affinity_str: str) -> None:
-    if not affinity_str:
-        return
-    try:
-        cores = {int(c) for c in affinity_str.split(",")}
-        os.sched_setaffinity(0, cores)
-    except Exception:
-        pass
+def _scanner_launch_prefix(config: Dict[str, Any]) -> List[str]:
+    """
+    nice/affinity lewat prefix argv (`nice -n N`, `taskset -c CPUS`) alih-alih preexec_fn:
+    tanpa callback Python di child, subprocess bisa memakai vfork/posix_spawn
+    (tidak menyalin page table proses Flask yang besar).
+    """
+    nice_adj = config.get("nice_adj") or 0
+    affinity_str = (config.get("affinity_str") or "").replace(" ", "")
+    return list(_launch_prefix(nice_adj, affinity_str))
+
 
+@functools.lru_cache(maxsize=8)
+def _launch_prefix(nice_adj: int, affinity_str: str) -> Tuple[str, ...]:
+    # Dihitung sekali per kombinasi (shutil.which + warning tidak diulang tiap scan)
+    prefix: List[str] = []
 
-def _build_scanner_preexec(config: Dict[str, Any]):
-    nice_adj = config.get("nice_adj", 0)
-    affinity_str = config.get("affinity_str") or ""
+    if nice_adj:
+        if shutil.which("nice"):
+            prefix += ["nice", "-n", str(nice_adj)]
+        else:
+            logger.warning("CPU_NICE_ADJUSTMENT=%s ignored: 'nice' not found in PATH.", nice_adj)
 
-    def _preexec():
-        _apply_nice(nice_adj)
-        _apply_affinity(affinity_str)
+    if affinity_str:
+        if not _AFFINITY_RE.match(affinity_str):
+            logger.warning("CPU_AFFINITY=%r ignored: expected a CPU list like '0,1' or '0-3'.", affinity_str)
+        elif shutil.which("taskset"):
+            prefix += ["taskset", "-c", affinity_str]
+        else:
+            logger.warning("CPU_AFFINITY=%s ignored: 'taskset' not found in PATH.", affinity_str)
 
-    return _preexec
+    return tuple(prefix)
 
 
 def _log_scanner_line(line: str) -> None:
@@ -248,14 +685,86 @@ def _log_scanner_line(line: str) -> None:
         logger.debug("[SONAR] %s", text)
 
 
-def _collect_scanner_output(proc: subprocess.Popen) -> List[str]:
-    output: List[str] = []
-    if not proc.stdout:
-        return output
-    for line in proc.stdout:
-        output.append(line)
-        _log_scanner_line(line)
-    return output
+# Output scanner ditulis langsung ke file log oleh kernel (bukan PIPE), sehingga
+# scanner tidak pernah tertahan menunggu Python membaca pipe.
+_SCANNER_READ_SIZE = 65536
+_SCANNER_TAIL_LINES = 4096
+# Bagian akhir file log yang dibaca saat scanner gagal (untuk pesan error & hint)
+_SCANNER_TAIL_BYTES = 1024 * 1024
+_SCANNER_FOLLOW_INTERVAL = 0.2
+
+
+def _open_scanner_log(project_key: Optional[str]) -> Tuple[int, str]:
+    """
+    File log baru per job (fd, path) di temp dir sistem: bukan di cache dir (bisa /dev/shm)
+    dan bukan di workdir repo (ikut di-scan). Scan paralel dengan key sama tidak saling timpa.
+    Caller wajib menghapus file setelah selesai.
+    """
+    name = (project_key or "scanner").replace("/", "_")
+    return tempfile.mkstemp(prefix=f"scan-{name}-", suffix=".log")
+
+
+def _has_info_trigger(data: bytes) -> bool:
+    # Superset dari kondisi INFO di _log_scanner_line, dicek langsung pada bytes
+    return b"INFO:" in data or b"SUCCESS" in data
+
+
+def _follow_scanner_log(log_path: str, done: threading.Event) -> None:
+    """
+    Tail -f file log scanner ke logger (thread daemon, hanya untuk visibilitas).
+    Berhenti setelah `done` di-set dan sisa file habis dibaca.
+    """
+    try:
+        fd = os.open(log_path, os.O_RDONLY)
+    except OSError:
+        return
+
+    # Tanpa DEBUG, hanya baris INFO:/SUCCESS yang akan tercetak: baris lain tidak
+    # perlu di-decode sama sekali, dan chunk tanpa trigger dilewati tanpa split.
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    carry = b""
+    try:
+        while True:
+            chunk = os.read(fd, _SCANNER_READ_SIZE)
+            if not chunk:
+                if done.is_set():
+                    break
+                done.wait(_SCANNER_FOLLOW_INTERVAL)
+                continue
+            buf = carry + chunk
+            if not debug_enabled and not _has_info_trigger(buf):
+                carry = buf[buf.rfind(b"\n") + 1:]
+                continue
+            lines = buf.split(b"\n")
+            carry = lines.pop()
+            for raw in lines:
+                if debug_enabled or _has_info_trigger(raw):
+                    _log_scanner_line(raw.decode("utf-8", "replace"))
+        if carry and (debug_enabled or _has_info_trigger(carry)):
+            _log_scanner_line(carry.decode("utf-8", "replace"))
+    finally:
+        os.close(fd)
+
+
+def _read_scanner_log_tail(log_path: str) -> List[bytes]:
+    """Baris terakhir file log scanner (maks _SCANNER_TAIL_BYTES / _SCANNER_TAIL_LINES)."""
+    try:
+        with open(log_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = max(0, size - _SCANNER_TAIL_BYTES)
+                data = mm[start:]
+    except (OSError, ValueError):
+        return []
+
+    lines = data.split(b"\n")
+    if start:
+        lines = lines[1:]  # baris pertama kemungkinan terpotong
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines[-_SCANNER_TAIL_LINES:]
 
 
 def _scanner_failure_hint(output: str) -> str:
@@ -266,10 +775,10 @@ def _scanner_failure_hint(output: str) -> str:
     return ""
 
 
-def _raise_scanner_failure(ret: int, output_lines: List[str]) -> None:
+def _raise_scanner_failure(ret: int, output_lines: Iterable[bytes]) -> None:
     if ret in (0, 2):
         return
-    output = "".join(output_lines)
+    output = b"\n".join(output_lines).decode("utf-8", "replace")
     hint = _scanner_failure_hint(output)
     if hint:
         output = f"{output}\nHint: {hint}\n"
@@ -282,29 +791,54 @@ def _run_scanner_process(
     cmd: List[str],
     tmp_dir: str,
     config: Dict[str, Any],
-    custom_cache_dir: Optional[str] = None
+    custom_cache_dir: Optional[str] = None,
+    project_key: Optional[str] = None
 ) -> int:
-    env, final_cache_dir = _build_scanner_env(config, custom_cache_dir)
+    env, final_cache_dir = _build_scanner_env(config, custom_cache_dir, project_key)
 
     # Safe to log cmd now (no token inside)
     logger.debug("Final Sonar command arguments: %s", " ".join(cmd))
     logger.debug("Scanner Cache Dir: %s", final_cache_dir)
 
-    proc = subprocess.Popen(
-        cmd,
-        cwd=tmp_dir,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        env=env,
-        preexec_fn=_build_scanner_preexec(config),
-    )
+    log_fd, log_path = _open_scanner_log(project_key)
+    try:
+        try:
+            proc = subprocess.Popen(
+                _scanner_launch_prefix(config) + cmd,
+                cwd=tmp_dir,
+                stdout=log_fd,
+                stderr=log_fd,
+                env=env,
+            )
+        finally:
+            # Child sudah mewarisi fd; parent tidak perlu menulis ke file
+            os.close(log_fd)
+
+        done = threading.Event()
+        follower = None
+        if logger.isEnabledFor(logging.INFO):
+            follower = threading.Thread(
+                target=_follow_scanner_log, args=(log_path, done),
+                name="sonar-log-follow", daemon=True,
+            )
+            follower.start()
 
-    full_output = _collect_scanner_output(proc)
-    ret = proc.wait()
-    _raise_scanner_failure(ret, full_output)
+        try:
+            ret = proc.wait()
+        finally:
+            done.set()
+            if follower:
+                follower.join(timeout=5)
 
-    return ret
+        if ret not in (0, 2):
+            _raise_scanner_failure(ret, _read_scanner_log_tail(log_path))
+
+        return ret
+    finally:
+        try:
+            os.unlink(log_path)
+        except OSError:
+            pass
 
 
 def limited_sonar_scan(
@@ -312,13 +846,16 @@ def limited_sonar_scan(
     project_key: str,
     exclusions: Optional[str] = None,
     inclusions: Optional[str] = None,
-    custom_cache_dir: Optional[str] = None
+    custom_cache_dir: Optional[str] = None,
+    config: Optional[Dict[str, Any]] = None
 ) -> str:
-    config = _get_sonar_config()
+    config = config or _get_sonar_config()
     cmd = _build_sonar_command(config, project_key, exclusions, inclusions, tmp_dir)
     
     # Pass custom_cache_dir ke process runner
-    exit_code = _run_scanner_process(cmd, tmp_dir, config, custom_cache_dir=custom_cache_dir)
+    exit_code = _run_scanner_process(
+        cmd, tmp_dir, config, custom_cache_dir=custom_cache_dir, project_key=project_key
+    )
 
     sonar_url = f"{config['host_url']}/dashboard?id={project_key}"
 
@@ -336,20 +873,35 @@ def clone_and_scan(
     project_key: str,
     exclusions: Optional[str] = None,
     inclusions: Optional[str] = None,
-    per_job_cache: bool = False
+    per_job_cache: bool = False,
+    config: Optional[Dict[str, Any]] = None,
+    workdirs: Optional[_WorkdirPool] = None
 ) -> str:
+    config = config or _get_sonar_config()
     tmp_dir = None
     job_cache_dir = None
+    shm_cache_dir = None
 
     try:
         # --- THREAD SAFE LOGIC ---
         # Hitung path cache secara lokal, JANGAN ubah os.environ global.
         if per_job_cache:
-            base_cache = os.getenv("SONAR_USER_HOME", "/cache")
-            job_cache_dir = os.path.abspath(os.path.join(base_cache, project_key.replace("/", "_")))
+            job_cache_dir = shm_cache_dir = _shm_cache_dir(config, project_key)
+            if not job_cache_dir:
+                job_cache_dir = _ensure_dir(os.path.join(config["cache_dir"], project_key.replace("/", "_")))
             logger.debug("Using per-job cache path: %s", job_cache_dir)
 
-        tmp_dir = limited_clone(repo_url, branch_name)
+        if workdirs is not None:
+            tmp_dir = workdirs.take(repo_url)
+            if tmp_dir:
+                try:
+                    refresh_clone(repo_url, branch_name, tmp_dir)
+                except Exception as e:
+                    logger.warning("Workdir reuse failed (%s); cloning fresh.", e)
+                    remove_clone(tmp_dir)
+                    tmp_dir = None
+        if not tmp_dir:
+            tmp_dir = limited_clone(repo_url, branch_name)
         
         # Kirim job_cache_dir ke fungsi scan
         return limited_sonar_scan(
@@ -357,12 +909,19 @@ def clone_and_scan(
             project_key, 
             exclusions=exclusions, 
             inclusions=inclusions,
-            custom_cache_dir=job_cache_dir
+            custom_cache_dir=job_cache_dir,
+            config=config
         )
     finally:
+        if shm_cache_dir:
+            # Cache di tmpfs = RAM; jangan ditinggal setelah job selesai
+            shutil.rmtree(shm_cache_dir, ignore_errors=True)
         if tmp_dir:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-            logger.debug("Removed temporary directory %s", tmp_dir)
+            if workdirs is not None and workdirs.put(repo_url, tmp_dir):
+                logger.debug("Kept workdir %s for the next job of %s", tmp_dir, repo_url)
+            else:
+                remove_clone(tmp_dir)
+                logger.debug("Removed temporary directory %s", tmp_dir)
 
 
 @dataclass
@@ -376,46 +935,32 @@ class ScanJob:
 
 
 class SonarScanQueue:
-    def __init__(self, num_workers: int = 1):
+    # Maksimal workdir clone yang disimpan untuk dipakai ulang (reuse_workdirs=True)
+    MAX_REUSED_WORKDIRS = 8
+
+    def __init__(self, num_workers: int = 1, reuse_workdirs: bool = False):
         if num_workers < 1:
             raise ValueError("num_workers minimal 1")
+        # Config dibangun & divalidasi sekali di sini, lalu dipakai semua job
+        self._config = _get_sonar_config()
+        _validate_sonar_config(self._config)
         self._num_workers = num_workers
-        self._q: "queue.Queue[Tuple[ScanJob, Future]]" = queue.Queue()
-        self._threads: List[threading.Thread] = []
-        self._stopping = threading.Event()
+        # Opt-in: scan berurutan untuk repo yang sama (misal main lalu branch PR)
+        # cukup fetch + reset di workdir lama, tanpa clone ulang
+        self._workdirs = _WorkdirPool(self.MAX_REUSED_WORKDIRS) if reuse_workdirs else None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
 
     def start(self) -> None:
-        if self._threads:
-            return
-        for i in range(self._num_workers):
-            t = threading.Thread(target=self._worker, name=f"sonar-worker-{i+1}", daemon=True)
-            t.start()
-            self._threads.append(t)
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._num_workers, thread_name_prefix="sonar-worker"
+            )
         logger.info("SonarScanQueue started with %d worker(s).", self._num_workers)
 
-    def _worker(self) -> None:
-        while not self._stopping.is_set():
-            try:
-                job, fut = self._q.get(timeout=0.5)
-            except queue.Empty:
-                continue
-
-            if fut.set_running_or_notify_cancel():
-                try:
-                    url = clone_and_scan(
-                        job.repo_url,
-                        job.branch_name,
-                        job.project_key,
-                        job.exclusions,
-                        job.inclusions,
-                        per_job_cache=job.per_job_cache,
-                    )
-                    fut.set_result(url)
-                except Exception as e:
-                    fut.set_exception(e)
-                finally:
-                    self._q.task_done()
-
     def enqueue(
         self,
         repo_url: str,
@@ -425,7 +970,8 @@ class SonarScanQueue:
         inclusions: Optional[str] = None,
         per_job_cache: bool = True
     ) -> Future:
-        fut: Future = Future()
+        # Lazy-start agar caller yang lupa start() tetap jalan
+        self.start()
         job = ScanJob(
             repo_url=repo_url,
             branch_name=branch_name,
@@ -434,18 +980,35 @@ class SonarScanQueue:
             inclusions=inclusions,
             per_job_cache=per_job_cache,
         )
-        self._q.put((job, fut))
+        fut = self._pool.submit(
+            clone_and_scan,
+            job.repo_url,
+            job.branch_name,
+            job.project_key,
+            job.exclusions,
+            job.inclusions,
+            per_job_cache=job.per_job_cache,
+            config=self._config,
+            workdirs=self._workdirs,
+        )
+        with self._lock:
+            self._futures.append(fut)
         logger.info("Enqueued job project_key=%s branch=%s", project_key, branch_name)
         return fut
 
     def join(self) -> None:
-        self._q.join()
+        with self._lock:
+            pending, self._futures = self._futures, []
+        wait(pending)
 
     def stop(self) -> None:
-        self._stopping.set()
-        for t in self._threads:
-            t.join(timeout=1.0)
-        self._threads.clear()
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._futures = []
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if self._workdirs is not None:
+            self._workdirs.clear()
         logger.info("SonarScanQueue stopped.")
 
 
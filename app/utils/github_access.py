@@ -1,24 +1,51 @@
 # app/utils/github_access.py
 
-import requests
 import re
 import os
 import netrc
 import logging
-from typing import List, Dict
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 
 # Hapus GITHUB_TOKEN dari import, cukup URL saja
 from app.utils.github_api import GITHUB_API_URL 
+from app.utils._http import GITHUB_SESSION
 
 logger = logging.getLogger(__name__)
 
+# Satu token input (dipisah spasi/koma), salah satu dari:
+#   url  : ...github.com/<org>/<repo>[.git][/...]  -> nama repo
+#   bad  : token lain yang mengandung github.com   -> URL tidak valid
+#   name : nama repo biasa
+_REPO_TOKEN_RE = re.compile(
+    r"[^\s,]*?github\.com/[^/\s,]+/(?P<url>[^/\s,]+?)(?:\.git)?(?:/[^\s,]*)?(?=[\s,]|$)"
+    r"|(?P<bad>[^\s,]*github\.com[^\s,]*)"
+    r"|(?P<name>[^\s,]+)"
+)
+
+# Batas request paralel saat validasi repo
+MAX_VALIDATION_WORKERS = 8
+
+# Cache hasil cek repo (ada / tidak ada) per (org, repo); keberadaan repo jarang berubah
+REPO_CHECK_TTL_SECONDS = 300
+REPO_CHECK_CACHE_SIZE = 4096
+# Hanya status definitif yang di-cache; error jaringan/401/5xx selalu dicek ulang
+_CACHEABLE_STATUSES = (200, 404)
+_repo_check_cache: Dict[Tuple[str, str], Tuple[float, int]] = {}
+_repo_check_lock = threading.Lock()
+
 class GitHubAccessError(Exception):
     """Custom error for GitHub Access form issues."""
     pass
 
-def _get_auth_header() -> Dict[str, str]:
+@functools.lru_cache(maxsize=1)
+def _cached_auth_header() -> Mapping[str, str]:
     """
-    [HELPER] Mendapatkan header otentikasi.
+    [HELPER] Mendapatkan header otentikasi (dihitung sekali per proses).
     Prioritas:
     1. Environment Variable GITHUB_TOKEN
     2. File ~/.netrc (entry machine 'github.com')
@@ -27,7 +54,7 @@ def _get_auth_header() -> Dict[str, str]:
     env_token = os.getenv("GITHUB_TOKEN")
     if env_token:
         logger.debug("Using GitHub credentials from Environment Variable (GITHUB_TOKEN)")
-        return {"Authorization": f"Bearer {env_token}"}
+        return MappingProxyType({"Authorization": f"Bearer {env_token}"})
 
     # 2. Cek .netrc
     try:
@@ -46,7 +73,7 @@ def _get_auth_header() -> Dict[str, str]:
                 # Di GitHub, password di .netrc harusnya adalah Personal Access Token (PAT)
                 if password:
                     logger.debug("Using GitHub credentials from .netrc")
-                    return {"Authorization": f"Bearer {password}"}
+                    return MappingProxyType({"Authorization": f"Bearer {password}"})
         else:
             logger.debug(f".netrc file not found at {netrc_path}")
 
@@ -56,45 +83,73 @@ def _get_auth_header() -> Dict[str, str]:
     # Jika tidak ada auth di .netrc, return kosong (Unauthenticated request)
     # Hati-hati: Rate limit GitHub sangat rendah untuk unauthenticated request (60/jam).
     logger.warning("No GitHub credentials found in Env or .netrc. Requesting anonymously.")
-    return {}
+    return MappingProxyType({})
+
+def _get_auth_header() -> Dict[str, str]:
+    """Salinan header auth yang aman dimodifikasi caller."""
+    return dict(_cached_auth_header())
+
+def _invalidate_auth_cache() -> None:
+    """Paksa token dibaca ulang (Env / .netrc), misal setelah rotasi token atau di test."""
+    _cached_auth_header.cache_clear()
+    # Hasil 200/404 bergantung pada akses token lama (repo private bisa 404)
+    _clear_repo_check_cache()
 
 def parse_repositories(repo_input: str) -> List[str]:
     """
     Mem-parsing input repositori yang bisa dipisahkan oleh koma, spasi, atau baris baru.
     """
-    # Normalisasikan input: ganti baris baru/spasi dengan koma
-    normalized_input = re.sub(r'[\s,]+', ',', repo_input)
-    raw_list = normalized_input.split(',')
-    
-    repo_names = []
-
-    for repo in raw_list:
-        repo = repo.strip()
-        if not repo:
-            continue
-
-        if "github.com" in repo:
-            # Menggunakan regex untuk mengekstrak nama repo dari URL
-            match = re.search(r"github\.com\/[^\/]+\/([^\/\s]+)", repo)
-            if match:
-                repo_name = match.group(1)
-                if repo_name.endswith('.git'):
-                    repo_name = repo_name[:-4]
-                repo_names.append(repo_name)
-            else:
-                raise GitHubAccessError(f"Invalid GitHub URL format: {repo}")
-        else:
-            repo_names.append(repo)
-
-    if not repo_names:
+    # Satu pass finditer; dict menjaga urutan sekaligus menghapus duplikat
+    seen: Dict[str, None] = {}
+    for match in _REPO_TOKEN_RE.finditer(repo_input):
+        bad_url = match.group("bad")
+        if bad_url:
+            raise GitHubAccessError(f"Invalid GitHub URL format: {bad_url}")
+        seen.setdefault(match.group("url") or match.group("name"), None)
+
+    if not seen:
         raise GitHubAccessError("No valid repository names found in input.")
 
-    return list(dict.fromkeys(repo_names)) # Hapus duplikat sambil menjaga urutan
-
-def is_valid_github_repo(org: str, repo_name: str) -> bool:
+    return list(seen)
+
+def _cached_repo_status(key: Tuple[str, str]) -> Optional[int]:
+    with _repo_check_lock:
+        entry = _repo_check_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, status = entry
+        if expires_at <= time.monotonic():
+            del _repo_check_cache[key]
+            return None
+        return status
+
+def _store_repo_status(key: Tuple[str, str], status: int) -> None:
+    now = time.monotonic()
+    with _repo_check_lock:
+        if len(_repo_check_cache) >= REPO_CHECK_CACHE_SIZE:
+            # Buang yang kedaluwarsa dulu; jika masih penuh, buang entry tertua (urutan insert)
+            for k in [k for k, (exp, _) in _repo_check_cache.items() if exp <= now]:
+                del _repo_check_cache[k]
+            while len(_repo_check_cache) >= REPO_CHECK_CACHE_SIZE:
+                del _repo_check_cache[next(iter(_repo_check_cache))]
+        _repo_check_cache[key] = (now + REPO_CHECK_TTL_SECONDS, status)
+
+def _clear_repo_check_cache() -> None:
+    """Kosongkan cache validasi repo (misal setelah repo baru dibuat, atau di test)."""
+    with _repo_check_lock:
+        _repo_check_cache.clear()
+
+def _get_repo_status(org: str, repo_name: str) -> Optional[int]:
     """
-    Checks if the given repository exists in the GitHub organization.
+    HTTP status GET /repos/{org}/{repo}; None jika terjadi network error.
+    Hasil 200/404 di-cache selama REPO_CHECK_TTL_SECONDS.
     """
+    # Nama org/repo di GitHub case-insensitive
+    key = (org.lower(), repo_name.lower())
+    cached = _cached_repo_status(key)
+    if cached is not None:
+        return cached
+
     # Ambil auth header dari .netrc
     headers = _get_auth_header()
     
@@ -105,11 +160,51 @@ def is_valid_github_repo(org: str, repo_name: str) -> bool:
 
     try:
         # Timeout 10 detik agar worker tidak hang jika GitHub lambat
-        response = requests.get(url, headers=headers, timeout=10)
-        return response.status_code == 200
+        response = GITHUB_SESSION.get(url, headers=headers, timeout=10)
     except Exception as e:
         logger.error(f"Error checking repo {repo_name}: {e}")
-        return False
+        return None
+
+    status = response.status_code
+    if status in _CACHEABLE_STATUSES:
+        _store_repo_status(key, status)
+    return status
+
+def is_valid_github_repo(org: str, repo_name: str) -> bool:
+    """
+    Checks if the given repository exists in the GitHub organization.
+    """
+    return _get_repo_status(org, repo_name) == 200
+
+def _find_invalid_repos(organization: str, repo_list: List[str]) -> List[str]:
+    """
+    Validasi repo secara paralel; return repo yang tidak ditemukan (urutan input).
+    Berhenti lebih awal jika GitHub menolak kredensial (401) agar kuota tidak terbuang.
+    """
+    statuses: Dict[str, Optional[int]] = {}
+    workers = min(MAX_VALIDATION_WORKERS, len(repo_list))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_repo = {
+            executor.submit(_get_repo_status, organization, repo): repo
+            for repo in repo_list
+        }
+        for future in as_completed(future_to_repo):
+            status = future.result()
+            if status == 401:
+                for pending in future_to_repo:
+                    pending.cancel()
+                raise GitHubAccessError(
+                    "GitHub rejected the configured credentials (401). Check GITHUB_TOKEN or .netrc."
+                )
+            if status == 429:
+                for pending in future_to_repo:
+                    pending.cancel()
+                raise GitHubAccessError(
+                    "GitHub API rate limit reached (429). Please try again later."
+                )
+            statuses[future_to_repo[future]] = status
+
+    return [repo for repo in repo_list if statuses.get(repo) != 200]
 
 def process_github_access_form(data: Dict) -> Dict:
     """
@@ -136,10 +231,7 @@ def process_github_access_form(data: Dict) -> Dict:
     repo_list = parse_repositories(repositories_input)
 
     # Validate that each repository actually exists
-    invalid_repos = []
-    for repo in repo_list:
-        if not is_valid_github_repo(organization, repo):
-            invalid_repos.append(repo)
+    invalid_repos = _find_invalid_repos(organization, repo_list)
 
     if invalid_repos:
         raise GitHubAccessError(
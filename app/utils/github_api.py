@@ -4,13 +4,18 @@ import os
 import requests
 import netrc
 import logging
-from typing import Dict, Optional
+import functools
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from app.utils._http import GITHUB_SESSION
 
 # Setup logger
 logger = logging.getLogger(__name__)
 
 GITHUB_API_URL = "https://api.github.com"
 
+@functools.lru_cache(maxsize=1)
 def _get_token_from_netrc() -> Optional[str]:
     """Mencoba mengambil token dari file ~/.netrc"""
     try:
@@ -28,9 +33,10 @@ def _get_token_from_netrc() -> Optional[str]:
         logger.warning(f"Failed to read .netrc: {e}")
     return None
 
-def _get_auth_headers() -> Dict[str, str]:
+@functools.lru_cache(maxsize=1)
+def _cached_auth_headers() -> Mapping[str, str]:
     """
-    Membungkus pembuatan header.
+    Membungkus pembuatan header (dihitung sekali per proses).
     Prioritas:
     1. Environment Variable GITHUB_TOKEN
     2. File ~/.netrc
@@ -51,7 +57,16 @@ def _get_auth_headers() -> Dict[str, str]:
     else:
         logger.warning("No GitHub Token found in Env ('GITHUB_TOKEN') or .netrc. API calls might fail or be rate-limited.")
 
-    return headers
+    return MappingProxyType(headers)
+
+def _get_auth_headers() -> Dict[str, str]:
+    """Salinan header auth yang aman dimodifikasi caller."""
+    return dict(_cached_auth_headers())
+
+def _invalidate_auth_cache() -> None:
+    """Paksa token dibaca ulang (Env / .netrc), misal setelah rotasi token atau di test."""
+    _get_token_from_netrc.cache_clear()
+    _cached_auth_headers.cache_clear()
 
 def add_collaborator_to_repo(owner: str, repo: str, username: str, permission: str = "push") -> dict:
     """
@@ -64,7 +79,7 @@ def add_collaborator_to_repo(owner: str, repo: str, username: str, permission: s
     data = {"permission": permission}
 
     try:
-        response = requests.put(url, headers=headers, json=data, timeout=10)
+        response = GITHUB_SESSION.put(url, headers=headers, json=data, timeout=10)
 
         # Kasus sukses: Pengguna baru diundang
         if response.status_code == 201:
@@ -114,7 +129,7 @@ def is_user_already_invited(owner: str, repo: str, username: str) -> bool:
     headers = _get_auth_headers()
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = GITHUB_SESSION.get(url, headers=headers, timeout=10)
         return response.status_code == 204
     except requests.RequestException:
         return False
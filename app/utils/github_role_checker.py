@@ -1,40 +1,86 @@
 # app/utils/github_role_checker.py
 
+import logging
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from flask import current_app
+from urllib.parse import urlparse, parse_qs
 
 # [PERUBAHAN] Import helper auth dari file sebelah agar konsisten & support .netrc
 from app.utils.github_api import _get_auth_headers
+from app.utils._http import GITHUB_SESSION
 
-def fetch_all_pages(url, headers):
-    """Helper function to fetch all pages of a GitHub API endpoint."""
-    all_items = []
-    page = 1
+logger = logging.getLogger(__name__)
 
-    while True:
-        # Menangani URL yang mungkin sudah ada query params (misal ?foo=bar)
-        separator = "&" if "?" in url else "?"
-        full_url = f"{url}{separator}per_page=100&page={page}"
-        
-        try:
-            resp = requests.get(full_url, headers=headers, timeout=10)
-        except requests.RequestException as e:
-            raise RuntimeError(f"Network error fetching page {page}: {e}")
+PER_PAGE = 100
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Jumlah repo per query GraphQL (pakai alias r0..rN)
+GRAPHQL_BATCH_SIZE = 50
+# Permission GraphQL -> nilai `permission` legacy yang dikembalikan REST API
+_GRAPHQL_PERMISSION_MAP = {
+    "ADMIN": "admin",
+    "MAINTAIN": "write",
+    "WRITE": "write",
+    "TRIAGE": "read",
+    "READ": "read",
+}
+# Maksimal request halaman paralel setelah halaman pertama
+MAX_PAGE_WORKERS = 16
+
+def _fetch_page(url, headers, page):
+    """GET satu halaman; return (response, items)."""
+    # Menangani URL yang mungkin sudah ada query params (misal ?foo=bar)
+    separator = "&" if "?" in url else "?"
+    full_url = f"{url}{separator}per_page={PER_PAGE}&page={page}"
+
+    try:
+        resp = GITHUB_SESSION.get(full_url, headers=headers, timeout=10)
+    except requests.RequestException as e:
+        raise RuntimeError(f"Network error fetching page {page}: {e}")
+
+    if resp.status_code != 200:
+        raise RuntimeError(f"Failed to fetch page {page}: {resp.status_code} - {resp.text}")
+
+    items = resp.json()
+    if not isinstance(items, list):
+        # Kadang jika error, GitHub return dict message, bukan list
+        raise ValueError(f"Unexpected response format at page {page}: {items}")
 
-        if resp.status_code != 200:
-            raise RuntimeError(f"Failed to fetch page {page}: {resp.status_code} - {resp.text}")
+    return resp, items
 
-        items = resp.json()
-        if not isinstance(items, list):
-            # Kadang jika error, GitHub return dict message, bukan list
-            raise ValueError(f"Unexpected response format at page {page}: {items}")
+def _last_page_number(resp):
+    """Ambil nomor halaman terakhir dari header Link (rel="last"), jika ada."""
+    last_url = resp.links.get("last", {}).get("url")
+    if not last_url:
+        return None
+    try:
+        return int(parse_qs(urlparse(last_url).query)["page"][0])
+    except (KeyError, IndexError, ValueError):
+        return None
 
+def fetch_all_pages(url, headers):
+    """Helper function to fetch all pages of a GitHub API endpoint."""
+    resp, items = _fetch_page(url, headers, 1)
+    all_items = list(items)
+
+    # GitHub mengirim Link rel="last" di halaman pertama jika ada >1 halaman:
+    # halaman 2..N bisa diambil paralel, urutan tetap dijaga oleh executor.map
+    last_page = _last_page_number(resp)
+    if last_page is not None:
+        if last_page > 1:
+            pages = range(2, last_page + 1)
+            with ThreadPoolExecutor(max_workers=min(MAX_PAGE_WORKERS, len(pages))) as executor:
+                for page_items in executor.map(lambda p: _fetch_page(url, headers, p)[1], pages):
+                    all_items.extend(page_items)
+        return all_items
+
+    # Fallback: jalan serial; berhenti saat tidak ada rel="next" atau halaman tidak penuh
+    page = 1
+    while "next" in resp.links or (not resp.links and len(items) >= PER_PAGE):
+        page += 1
+        resp, items = _fetch_page(url, headers, page)
         if not items:
             break  # No more data
-
         all_items.extend(items)
-        page += 1
 
     return all_items
 
@@ -64,17 +110,105 @@ def fetch_repositories(org, mode, team_slugs):
     else:
         raise ValueError("Invalid mode. Must be 'all' or 'team'.")
 
+def _build_permission_query(count):
+    var_defs = ["$owner: String!", "$user: String!"] + [f"$n{i}: String!" for i in range(count)]
+    fields = [
+        f"r{i}: repository(owner: $owner, name: $n{i}) "
+        "{ collaborators(query: $user, first: 10) { edges { permission node { login } } } }"
+        for i in range(count)
+    ]
+    return f"query({', '.join(var_defs)}) {{ {' '.join(fields)} }}"
+
+def _parse_permission_batch(payload, names, username):
+    """Ubah response GraphQL satu batch jadi (results, unresolved_names)."""
+    data = payload.get("data") or {}
+    not_found = {
+        err["path"][0]
+        for err in payload.get("errors") or []
+        if err.get("type") == "NOT_FOUND" and len(err.get("path") or []) == 1
+    }
+
+    results, unresolved = [], []
+    wanted = username.lower()
+    for i, repo_name in enumerate(names):
+        alias = f"r{i}"
+        repo_data = data.get(alias)
+        if repo_data is None:
+            if alias in not_found:
+                results.append({"repo": repo_name, "status": "not_found", "role": "-"})
+            else:
+                unresolved.append(repo_name)
+            continue
+
+        collaborators = repo_data.get("collaborators")
+        if collaborators is None:
+            # Biasanya token tidak punya akses baca collaborator -> serahkan ke REST
+            unresolved.append(repo_name)
+            continue
+
+        # `query` bersifat fuzzy (login/nama), jadi cocokkan login secara persis
+        role = "none"
+        for edge in collaborators.get("edges") or []:
+            login = ((edge.get("node") or {}).get("login") or "").lower()
+            if login == wanted:
+                role = _GRAPHQL_PERMISSION_MAP.get(edge.get("permission"), "none")
+                break
+        results.append({"repo": repo_name, "status": "found", "role": role})
+
+    return results, unresolved
+
+def check_user_permissions_graphql(org, username, repo_names, headers=None):
+    """
+    Cek permission user untuk banyak repo sekaligus via GraphQL
+    (satu request per GRAPHQL_BATCH_SIZE repo).
+
+    Returns (results, unresolved): results berformat sama dengan REST
+    ({"repo", "status", "role"}); unresolved = nama repo yang perlu dicek via REST.
+    """
+    headers = dict(headers if headers is not None else _get_auth_headers())
+    if "Authorization" not in headers:
+        # GraphQL API wajib terautentikasi
+        return [], list(repo_names)
+    headers["Content-Type"] = "application/json"
+
+    results, unresolved = [], []
+    for start in range(0, len(repo_names), GRAPHQL_BATCH_SIZE):
+        names = repo_names[start:start + GRAPHQL_BATCH_SIZE]
+        variables = {"owner": org, "user": username}
+        variables.update({f"n{i}": name for i, name in enumerate(names)})
+        body = {"query": _build_permission_query(len(names)), "variables": variables}
+
+        try:
+            resp = GITHUB_SESSION.post(GRAPHQL_URL, headers=headers, json=body, timeout=30)
+            if resp.status_code != 200:
+                raise RuntimeError(f"GraphQL status {resp.status_code}")
+            batch_results, batch_unresolved = _parse_permission_batch(resp.json(), names, username)
+        except Exception as e:
+            logger.warning("GraphQL permission check failed, falling back to REST: %s", e)
+            unresolved.extend(names)
+            continue
+
+        results.extend(batch_results)
+        unresolved.extend(batch_unresolved)
+
+    return results, unresolved
+
 def check_user_permissions(org, username, repos, max_workers=10):
-    """Check user's role across repositories using multithreading."""
+    """Check user's role across repositories (GraphQL batch, REST fallback)."""
 
     # [PERUBAHAN] Ambil headers dari central config (Env / .netrc)
     headers = _get_auth_headers()
 
+    repo_names = [r.get("name") for r in repos if r.get("name")]
+    results, remaining = check_user_permissions_graphql(org, username, repo_names, headers=headers)
+    if not remaining:
+        return results
+
     def check_repo(repo_name):
         url = f"https://api.github.com/repos/{org}/{repo_name}/collaborators/{username}/permission"
         try:
             # Timeout penting untuk thread worker
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = GITHUB_SESSION.get(url, headers=headers, timeout=10)
 
             if resp.status_code == 200:
                 perm = resp.json().get("permission", "-")
@@ -102,14 +236,13 @@ def check_user_permissions(org, username, repos, max_workers=10):
                 "role": f"NetError: {str(e)}"
             }
 
-    results = []
-    
-    # Threading untuk mempercepat pengecekan banyak repo
+    # Threading untuk mempercepat pengecekan repo yang tidak terjawab GraphQL
+    worker_errors = []
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Mapping future ke nama repo untuk error handling
         future_to_repo = {
-            executor.submit(check_repo, r.get("name")): r.get("name") 
-            for r in repos if r.get("name")
+            executor.submit(check_repo, name): name
+            for name in remaining
         }
 
         for future in as_completed(future_to_repo):
@@ -117,11 +250,15 @@ def check_user_permissions(org, username, repos, max_workers=10):
                 results.append(future.result())
             except Exception as e:
                 repo_name = future_to_repo[future]
-                current_app.logger.error(f"❌ Error checking permission for {repo_name}: {e}")
+                worker_errors.append((repo_name, e))
                 results.append({
                     "repo": repo_name,
                     "status": "error",
                     "role": "WorkerError"
                 })
 
+    # Logging dilakukan setelah semua future selesai, di luar loop as_completed
+    for repo_name, e in worker_errors:
+        logger.error("❌ Error checking permission for %s: %s", repo_name, e)
+
     return results
\ No newline at end of file
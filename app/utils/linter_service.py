@@ -3,17 +3,92 @@
 from yamllint import linter
 from yamllint.config import YamlLintConfig
 from ruamel.yaml import YAML
-import tempfile
-import os
+import yaml
+import copy
+import hashlib
 import io
 import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import Config
 
 # Siapkan logger untuk file ini jika diperlukan
 logger = logging.getLogger(__name__)
 
+# Rule set default yamllint cukup di-parse sekali per proses (read-only, aman dibagi antar thread)
+_DEFAULT_LINT_CONFIG = YamlLintConfig('extends: default')
+
+# Cek sintaks pakai parser C libyaml (PyYAML, dependency yamllint) bila tersedia.
+# Cukup compose (node tree) tanpa konstruksi objek: tag custom (!Ref, !!python/...) tetap lolos
+# dan tidak ada objek Python yang dibuat dari input user.
+_SYNTAX_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Instance YAML() ruamel tidak thread-safe -> satu instance per thread, dibuat sekali
+_yaml_local = threading.local()
+
+def _autofix_yaml() -> YAML:
+    ryaml = getattr(_yaml_local, 'autofix', None)
+    if ryaml is None:
+        ryaml = YAML()
+        # Konfigurasi indentasi standar:
+        # mapping=2: indentasi anak key 2 spasi
+        # sequence=4: indentasi list (dash) 4 spasi dari parent (2 spasi extra)
+        # offset=2: jarak antara dash dan kontennya
+        ryaml.indent(mapping=2, sequence=4, offset=2)
+        ryaml.preserve_quotes = True
+        ryaml.explicit_start = True  # Paksa '---' di awal dokumen
+        ryaml.width = 4096           # Hindari wrapping line yang tidak perlu
+        _yaml_local.autofix = ryaml
+    return ryaml
+
+class _LRUCache:
+    """
+    Cache LRU kecil (thread-safe): saat penuh, entry yang paling lama tidak dipakai dibuang.
+    Entry lama yang sering dipakai dulu tetap menua, dan key baru tidak saling rebut satu slot.
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: "OrderedDict[bytes, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+# Hasil lint per hash konten: klik "validate" berulang pada YAML yang sama tidak perlu parse + lint ulang
+_lint_cache = _LRUCache(Config.LINT_CACHE_SIZE)
+# Output auto-fix per hash konten (string immutable, tidak perlu di-copy)
+_autofix_cache = _LRUCache(Config.LINT_CACHE_SIZE)
+
+def _content_key(content: str) -> bytes:
+    return hashlib.blake2b(content.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+
 def run_yaml_linting(content: str) -> dict:
     """
     Menjalankan validasi dan linting pada konten YAML dalam dua tahap.
+    Hasil untuk konten yang identik diambil dari cache LRU.
     
     Returns:
         dict: Berisi 'status' dan data pendukungnya.
@@ -21,38 +96,90 @@ def run_yaml_linting(content: str) -> dict:
     if not content:
         return {"status": "INVALID_SYNTAX", "error_message": "Konten tidak boleh kosong."}
 
-    # Tahap 1: Validasi Sintaksis dengan ruamel.yaml
-    yaml_parser = YAML()
+    key = _content_key(content)
+    cached = _lint_cache.get(key)
+    if cached is not None:
+        # Deep copy agar caller bebas memodifikasi hasil tanpa merusak cache
+        return copy.deepcopy(cached)
+
+    result = _lint_content(content)
+    _lint_cache.put(key, copy.deepcopy(result))
+    return result
+
+def _problem_columns(problems) -> Dict[str, list]:
+    """
+    Problems dalam layout kolom (satu list per field), bukan satu dict per problem:
+    alokasi lebih sedikit untuk file dengan ribuan warning & JSON lebih ringkas.
+    """
+    return {
+        'lines': [p.line for p in problems],
+        'cols': [p.column for p in problems],
+        'levels': [p.level for p in problems],
+        'messages': [p.desc for p in problems],
+    }
+
+def iter_problems(result: dict) -> Iterator[Tuple[int, int, str, str]]:
+    """Tampilan per baris (line, col, level, message) dari hasil run_yaml_linting."""
+    columns = result.get('problems') or {}
+    return zip(
+        columns.get('lines', ()), columns.get('cols', ()),
+        columns.get('levels', ()), columns.get('messages', ()),
+    )
+
+def _lint_content(content: str) -> dict:
+    """Parse + lint tanpa cache (dipanggil run_yaml_linting saat cache miss)."""
+    # Tahap 1: Validasi Sintaksis dengan libyaml (ruamel hanya untuk auto-fix round-trip)
     try:
-        yaml_parser.load(content)
+        yaml.compose(content, Loader=_SYNTAX_LOADER)
     except Exception as e:
         logger.warning(f"Invalid YAML syntax: {e}")
         return {"status": "INVALID_SYNTAX", "error_message": f"Kesalahan sintaksis YAML: {str(e)}"}
 
     # Tahap 2: Validasi Kualitas (Linting) dengan yamllint
-    tmp_path = None
+    # linter.run menerima string langsung; tidak perlu tulis/baca ulang tempfile
+    # (stream pun akan di-.read() utuh oleh yamllint, jadi StringIO tidak menghemat apa-apa).
+    # Newline dinormalisasi seperti saat file dibaca dengan mode teks (universal newlines);
+    # konten tanpa '\r' dipakai apa adanya tanpa salinan.
+    lint_source = content
+    if '\r' in lint_source:
+        lint_source = lint_source.replace('\r\n', '\n').replace('\r', '\n')
     try:
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.yaml', encoding='utf-8') as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-        
-        conf = YamlLintConfig('extends: default')
-        with open(tmp_path, 'r', encoding='utf-8') as tmp_file:
-            problems = list(linter.run(tmp_file, conf, tmp_path))
+        problems = list(linter.run(lint_source, _DEFAULT_LINT_CONFIG))
         
-        results = [{'line': p.line, 'col': p.column, 'level': p.level, 'message': p.desc} for p in problems]
-
-        if not results:
-            return {"status": "PERFECT", "problems": []}
+        if not problems:
+            return {"status": "PERFECT", "problems": _problem_columns([])}
         else:
-            return {"status": "VALID_WITH_ISSUES", "problems": results}
+            return {"status": "VALID_WITH_ISSUES", "problems": _problem_columns(problems)}
 
     except Exception as e:
         logger.exception("Error during yamllint process")
         raise e
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+
+# Batch kecil lebih cepat diproses serial daripada dikirim ke proses lain (pickle + IPC)
+_BATCH_PARALLEL_MIN = 4
+_BATCH_CHUNKSIZE = 4
+_batch_pool: Optional[ProcessPoolExecutor] = None
+_batch_pool_lock = threading.Lock()
+
+def _get_batch_pool() -> ProcessPoolExecutor:
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # forkserver: aman dipakai dari proses web yang multi-thread (fork langsung tidak)
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('forkserver'),
+            )
+        return _batch_pool
+
+def run_yaml_linting_batch(contents: List[str]) -> List[dict]:
+    """
+    Lint banyak konten YAML sekaligus; parsing + linting (CPU-bound) dibagi ke process pool.
+    Urutan hasil sama dengan urutan input.
+    """
+    if len(contents) < _BATCH_PARALLEL_MIN:
+        return [run_yaml_linting(content) for content in contents]
+    return list(_get_batch_pool().map(run_yaml_linting, contents, chunksize=_BATCH_CHUNKSIZE))
 
 # [FUNGSI YANG PERLU DITAMBAHKAN]
 def auto_fix_yaml(content: str) -> str:
@@ -71,26 +198,33 @@ def auto_fix_yaml(content: str) -> str:
     if not content or not content.strip():
         return content
 
-    yaml = YAML()
-    # Konfigurasi indentasi standar:
-    # mapping=2: indentasi anak key 2 spasi
-    # sequence=4: indentasi list (dash) 4 spasi dari parent (2 spasi extra)
-    # offset=2: jarak antara dash dan kontennya
-    yaml.indent(mapping=2, sequence=4, offset=2)
-    yaml.preserve_quotes = True
-    yaml.explicit_start = True  # Paksa '---' di awal dokumen
-    yaml.width = 4096           # Hindari wrapping line yang tidak perlu
+    key = _content_key(content)
+    cached = _autofix_cache.get(key)
+    if cached is not None:
+        return cached
+
+    fixed_content = _auto_fix_uncached(content)
+    _autofix_cache.put(key, fixed_content)
+    return fixed_content
+
+def _auto_fix_uncached(content: str) -> str:
+    # Sudah eksplisit '---' dan lolos lint tanpa catatan: tidak ada yang perlu diperbaiki,
+    # lewati round-trip ruamel (load + dump) yang mahal
+    if content.lstrip().startswith('---') and run_yaml_linting(content)['status'] == 'PERFECT':
+        return content
+
+    ryaml = _autofix_yaml()
 
     try:
         # Gunakan load_all untuk mendukung multi-document (misal K8s manifests)
-        data = list(yaml.load_all(content))
+        data = list(ryaml.load_all(content))
         
         # Jika hasil load kosong (misal hanya komentar), kembalikan aslinya
         if not data:
             return content
 
         string_stream = io.StringIO()
-        yaml.dump_all(data, string_stream)
+        ryaml.dump_all(data, string_stream)
         fixed_content = string_stream.getvalue()
         
         # ruamel.yaml kadang tidak menambahkan newline di akhir file
@@ -1,10 +1,17 @@
+import functools
+import io
 import os
 import uuid
 import time
 import logging
-from typing import Tuple, Optional
+import threading
+from typing import Dict, Tuple, Optional
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+try:
+    from PIL import Image
+except ImportError:  # optional: tanpa Pillow, SCREENSHOT_FORMAT=webp jatuh ke PNG
+    Image = None
 from app.config import Config
 
 logger = logging.getLogger(__name__)
@@ -36,45 +43,151 @@ def _get_screenshot_ttl_seconds() -> int:
     return hours * 60 * 60
 
 
+# Ekstensi file per format screenshot (SCREENSHOT_FORMAT)
+_FORMAT_EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+# Cleanup tetap mengenali semua format, termasuk file lama sebelum format diganti
+_SCREENSHOT_EXTENSIONS = tuple(_FORMAT_EXTENSIONS.values())
+
+
+@functools.lru_cache(maxsize=1)
+def _get_screenshot_format() -> str:
+    fmt = str(Config.SCREENSHOT_FORMAT).strip().lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in _FORMAT_EXTENSIONS:
+        logger.warning("Invalid SCREENSHOT_FORMAT=%r; using png", fmt)
+        return "png"
+    if fmt == "webp" and Image is None:
+        logger.warning("SCREENSHOT_FORMAT=webp needs Pillow (not installed); using png")
+        return "png"
+    return fmt
+
+
+def _capture_screenshot(target, filepath: str, fmt: str, **kwargs) -> None:
+    """
+    Screenshot `target` (page / locator) ke `filepath` dalam format `fmt`.
+    PNG & JPEG ditulis langsung oleh Playwright; WebP di-encode dari PNG in-memory via Pillow.
+    """
+    if fmt == "webp":
+        png_bytes = target.screenshot(type="png", **kwargs)
+        with Image.open(io.BytesIO(png_bytes)) as img:
+            img.save(filepath, "WEBP", quality=Config.SCREENSHOT_QUALITY, method=6)
+    elif fmt == "jpeg":
+        target.screenshot(path=filepath, type="jpeg", quality=Config.SCREENSHOT_QUALITY, **kwargs)
+    else:
+        target.screenshot(path=filepath, **kwargs)
+
+
+# Cleanup berjalan di thread background, scan direktori sekali per ttl/4;
+# request screenshot tidak lagi menanggung biaya scandir + unlink
+_CLEANUP_INTERVAL_DIVISOR = 4
+_cleanup_thread: Optional[threading.Thread] = None
+_cleanup_thread_lock = threading.Lock()
+# mtime per nama file yang sudah pernah di-stat; nama file unik (uuid) & tidak pernah
+# ditulis ulang, jadi mtime-nya tetap dan stat cukup sekali per file
+_known_mtimes: Dict[str, float] = {}
+
+
 def _cleanup_old_screenshots(ttl_seconds: int) -> None:
     if ttl_seconds <= 0:
         return
-    now = time.time()
     try:
+        now = time.time()
+        seen = set()
         for entry in os.scandir(SCREENSHOT_DIR):
             if not entry.is_file():
                 continue
-            if not entry.name.lower().endswith(".png"):
-                continue
-            try:
-                mtime = entry.stat().st_mtime
-            except FileNotFoundError:
+            if not entry.name.lower().endswith(_SCREENSHOT_EXTENSIONS):
                 continue
+            mtime = _known_mtimes.get(entry.name)
+            if mtime is None:
+                try:
+                    mtime = _known_mtimes[entry.name] = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
             if now - mtime > ttl_seconds:
-                os.remove(entry.path)
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+                _known_mtimes.pop(entry.name, None)
+            else:
+                seen.add(entry.name)
+        # Buang entry untuk file yang sudah tidak ada agar dict tidak tumbuh
+        for name in _known_mtimes.keys() - seen:
+            del _known_mtimes[name]
     except FileNotFoundError:
         return
     except Exception as exc:
         logger.warning("Failed to clean old screenshots: %s", exc)
 
 
+def _cleanup_loop(ttl_seconds: int) -> None:
+    interval = ttl_seconds / _CLEANUP_INTERVAL_DIVISOR
+    while True:
+        _cleanup_old_screenshots(ttl_seconds)
+        time.sleep(interval)
+
+
+def _start_cleanup_thread() -> None:
+    """Jalankan thread cleanup (daemon) sekali per proses; no-op jika TTL dimatikan."""
+    global _cleanup_thread
+    if _cleanup_thread is not None:
+        return
+    ttl_seconds = _get_screenshot_ttl_seconds()
+    if ttl_seconds <= 0:
+        return
+    with _cleanup_thread_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(
+                target=_cleanup_loop,
+                args=(ttl_seconds,),
+                name="screenshot-cleanup",
+                daemon=True,
+            )
+            _cleanup_thread.start()
+
+
 ############################################
 #   Utils: Detect badge selector
 ############################################
+_BADGE_SELECTOR_CANDIDATES = (
+    "[data-test='quality-gate-status']",
+    "div[data-test='overview__quality-gate-panel'] span",
+    "div[data-test='overview__quality-gate-panel'] [class*='QualityGate']",
+)
+
+# Kandidat pertama (sesuai prioritas) yang ada di halaman, atau null
+_FIRST_MATCHING_SELECTOR_JS = """
+(selectors) => selectors.find((sel) => document.querySelector(sel) !== null) ?? null
+"""
+
+
+# Selector yang terbukti cocok dipakai ulang untuk screenshot berikutnya (versi SonarQube
+# jarang berubah); dibuang lewat _forget_badge_selector() jika gagal dipakai
+_cached_badge_selector: Optional[str] = None
+
+
+def _forget_badge_selector() -> None:
+    global _cached_badge_selector
+    _cached_badge_selector = None
+
+
 def _get_quality_gate_badge_selector(page) -> Optional[str]:
-    candidate_selectors = [
-        "[data-test='quality-gate-status']",
-        "div[data-test='overview__quality-gate-panel'] span",
-        "div[data-test='overview__quality-gate-panel'] [class*='QualityGate']",
-    ]
+    global _cached_badge_selector
+    if _cached_badge_selector is not None:
+        return _cached_badge_selector
 
-    for selector in candidate_selectors:
-        try:
-            if page.locator(selector).count() > 0:
-                logger.info(f"Using Quality Gate badge selector: {selector}")
-                return selector
-        except Exception:
-            continue
+    # Semua kandidat dicek dalam satu evaluate (1 round-trip IPC, bukan 1 count() per kandidat)
+    try:
+        selector = page.evaluate(_FIRST_MATCHING_SELECTOR_JS, list(_BADGE_SELECTOR_CANDIDATES))
+    except Exception:
+        selector = None
+
+    if selector:
+        logger.info(f"Using Quality Gate badge selector: {selector}")
+        _cached_badge_selector = selector
+        return selector
 
     logger.warning("Quality Gate badge selector not found.")
     return None
@@ -83,47 +196,188 @@ def _get_quality_gate_badge_selector(page) -> Optional[str]:
 ############################################
 #   Polling Logic
 ############################################
+# Return teks badge baru jika berbeda dari `prev`, selain itu false (terus menunggu)
+_BADGE_CHANGED_JS = """
+([sel, prev]) => {
+    const el = document.querySelector(sel);
+    if (!el) return false;
+    const text = el.innerText.trim();
+    return text !== prev ? text : false;
+}
+"""
+
+# Polling badge adaptif: interval awal, batas atas, dan jumlah poll sebelum interval dinaikkan
+_POLL_START_INTERVAL_MS = 250
+_POLL_MAX_INTERVAL_MS = 2000
+_POLLS_PER_INTERVAL = 4
+
+
 def _wait_for_quality_gate_update(
     page,
     badge_selector: str,
     max_wait_ms: int = 60000,
-    interval_ms: int = 2000,
 ) -> Tuple[bool, Optional[str], int]:
     """
-    Polling badge Quality Gate untuk mendeteksi perubahan.
+    Tunggu badge Quality Gate berubah. Dievaluasi di browser (wait_for_function),
+    dengan interval polling adaptif: mulai rapat (update biasanya datang cepat),
+    lalu melebar x1.5 sampai _POLL_MAX_INTERVAL_MS agar tidak boros CPU saat lambat.
     """
     start = time.time()
-    prev_text = None
 
     try:
         prev_text = page.locator(badge_selector).inner_text().strip()
-        latest_text = prev_text
     except Exception as e:
         logger.warning(f"Failed to read initial badge text: {e}")
         return False, None, 0
 
     logger.info(f"Initial badge text: {prev_text!r}")
 
-    while True:
-        elapsed_ms = int((time.time() - start) * 1000)
-        if elapsed_ms >= max_wait_ms:
-            logger.info(
-                f"Polling timeout {elapsed_ms}ms. Using latest: {latest_text!r}"
+    deadline = start + max_wait_ms / 1000
+    interval_ms = _POLL_START_INTERVAL_MS
+    latest_text = None
+    while latest_text is None:
+        remaining_ms = int((deadline - time.time()) * 1000)
+        if remaining_ms <= 0:
+            break
+        try:
+            handle = page.wait_for_function(
+                _BADGE_CHANGED_JS,
+                arg=[badge_selector, prev_text],
+                polling=interval_ms,
+                timeout=min(remaining_ms, interval_ms * _POLLS_PER_INTERVAL),
             )
-            return False, latest_text, elapsed_ms
+            latest_text = handle.json_value()
+        except PlaywrightTimeoutError:
+            interval_ms = min(int(interval_ms * 1.5), _POLL_MAX_INTERVAL_MS)
 
+    if latest_text is None:
+        elapsed_ms = int((time.time() - start) * 1000)
         try:
             latest_text = page.locator(badge_selector).inner_text().strip()
         except Exception:
-            pass
+            latest_text = prev_text
+        logger.info(
+            f"Polling timeout {elapsed_ms}ms. Using latest: {latest_text!r}"
+        )
+        return False, latest_text, elapsed_ms
+
+    elapsed_ms = int((time.time() - start) * 1000)
+    logger.info(
+        f"Badge updated from {prev_text!r} → {latest_text!r} in {elapsed_ms}ms"
+    )
+    return True, latest_text, elapsed_ms
 
-        if latest_text != prev_text:
-            logger.info(
-                f"Badge updated from {prev_text!r} → {latest_text!r} in {elapsed_ms}ms"
-            )
-            return True, latest_text, elapsed_ms
 
-        page.wait_for_timeout(interval_ms)
+# Interval sampling teks badge saat menunggu stabil
+_STABILITY_SAMPLE_MS = 500
+# Batas waktu networkidle & stabilisasi badge sebelum screenshot diambil apa adanya
+_SETTLE_TIMEOUT_MS = 10000
+
+
+def _wait_for_dashboard_settled(page, badge_selector: Optional[str], stability_ms: int) -> int:
+    """
+    Pengganti hard delay 30 detik: tunggu network idle, lalu pastikan teks badge
+    tidak berubah selama `stability_ms`. Return lama menunggu (ms).
+    """
+    start = time.time()
+
+    try:
+        page.wait_for_load_state("networkidle", timeout=_SETTLE_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        logger.info("Network not idle after %sms, continue anyway.", _SETTLE_TIMEOUT_MS)
+
+    if badge_selector and stability_ms > 0:
+        deadline = start + _SETTLE_TIMEOUT_MS * 2 / 1000
+        stable_for = 0
+        last_text = None
+        while stable_for < stability_ms and time.time() < deadline:
+            try:
+                text = page.locator(badge_selector).inner_text().strip()
+            except Exception:
+                text = None
+            if text is not None and text == last_text:
+                stable_for += _STABILITY_SAMPLE_MS
+            else:
+                stable_for = 0
+                last_text = text
+            if stable_for < stability_ms:
+                page.wait_for_timeout(_STABILITY_SAMPLE_MS)
+        if stable_for < stability_ms:
+            logger.info("Badge not stable before settle timeout, continue anyway.")
+
+    settle_ms = int((time.time() - start) * 1000)
+    logger.info(f"Dashboard settled in {settle_ms}ms.")
+    return settle_ms
+
+
+############################################
+#   Persistent browser (per worker thread)
+############################################
+# Objek Playwright sync API terikat ke thread pembuatnya, jadi satu browser
+# disimpan per thread worker (bukan global) dan dipakai ulang antar screenshot.
+# Sesi hanya bisa ditutup dari thread pemiliknya, sehingga tidak ada hook atexit:
+# saat proses berhenti, driver Playwright (dan Chromium di bawahnya) ikut berhenti
+# karena pipe ke proses Python tertutup.
+_LOGIN_PATH = "/sessions/new"
+_LOGIN_FORM_SELECTOR = 'input[name="login"]'
+_VIEWPORT = {"width": 1920, "height": 1200}
+
+_browser_local = threading.local()
+
+
+class _BrowserSession:
+    def __init__(self):
+        self.playwright = sync_playwright().start()
+        try:
+            self.browser = self.playwright.chromium.launch(headless=True)
+            self.context = self.browser.new_context(viewport=_VIEWPORT)
+        except Exception:
+            self.playwright.stop()
+            raise
+        self.logged_in = False
+
+    def close(self) -> None:
+        for closer in (self.browser.close, self.playwright.stop):
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+def _get_browser_session() -> _BrowserSession:
+    session = getattr(_browser_local, "session", None)
+    if session is not None and session.browser.is_connected():
+        return session
+    if session is not None:
+        _close_browser_session()
+
+    logger.info("Launching Chromium for screenshots (reused by this worker).")
+    session = _BrowserSession()
+    _browser_local.session = session
+    return session
+
+
+def _close_browser_session() -> None:
+    session = getattr(_browser_local, "session", None)
+    if session is None:
+        return
+    _browser_local.session = None
+    session.close()
+
+
+def _login(page, sonar_web_url: str, sonar_user: str, sonar_pass: str) -> bool:
+    try:
+        page.goto(sonar_web_url, timeout=60000)
+        page.locator(_LOGIN_FORM_SELECTOR).fill(sonar_user)
+        page.locator('input[name="password"]').fill(sonar_pass)
+        page.locator('button[type="submit"]').click()
+        # Form login hilang = login diterima; event-driven, tidak bergantung pada URL tujuan redirect
+        page.wait_for_selector(_LOGIN_FORM_SELECTOR, state="detached", timeout=30000)
+        logger.info("Login OK.")
+        return True
+    except Exception as e:
+        logger.error(f"Login failed: {e}")
+        return False
 
 
 ############################################
@@ -136,14 +390,14 @@ def take_sonar_screenshot(
 ) -> dict | None:
     """
     Ambil screenshot SonarQube:
-    - Login
+    - Login (sekali per browser worker, sesi dipakai ulang)
     - Buka project
     - Polling badge Quality Gate
-    - Hard wait 30 detik agar benar2 fresh
+    - Tunggu network idle + badge stabil (SCREENSHOT_STABILITY_MS)
     - Screenshot
     """
     _ensure_screenshot_dir()
-    _cleanup_old_screenshots(_get_screenshot_ttl_seconds())
+    _start_cleanup_thread()
 
     sonar_web_url = Config.SONARQUBE_WEB_URL
     sonar_user = Config.SONAR_USERNAME
@@ -155,113 +409,125 @@ def take_sonar_screenshot(
 
     target_url = f"{sonar_web_url}/dashboard?id={project_key}"
 
-    # Polling config (tetap, biarkan default)
+    # Batas tunggu perubahan badge (tetap, biarkan default)
     max_wait_ms = 60000
-    interval_ms = 2000
 
-    # Hard fixed delay 30 detik
-    fixed_delay_ms = 30000
+    stability_ms = Config.SCREENSHOT_STABILITY_MS
 
     logger.info(
-        f"Screenshot config: max_wait={max_wait_ms}ms, interval={interval_ms}ms, fixed_delay={fixed_delay_ms}ms"
+        f"Screenshot config: max_wait={max_wait_ms}ms, stability={stability_ms}ms"
     )
 
+    page = None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(viewport={"width": 1920, "height": 1200})
-            page = context.new_page()
-
-            #####################################
-            # LOGIN
-            #####################################
-            try:
-                page.goto(sonar_web_url, timeout=60000)
-                page.locator('input[name="login"]').fill(sonar_user)
-                page.locator('input[name="password"]').fill(sonar_pass)
-                page.locator('button[type="submit"]').click()
-                page.wait_for_url(f"{sonar_web_url}/projects", timeout=30000)
-                logger.info("Login OK.")
-            except Exception as e:
-                logger.error(f"Login failed: {e}")
-                browser.close()
+        session = _get_browser_session()
+        page = session.context.new_page()
+
+        #####################################
+        # LOGIN (sekali per sesi browser; cookie disimpan di context)
+        #####################################
+        if not session.logged_in:
+            if not _login(page, sonar_web_url, sonar_user, sonar_pass):
                 return None
-
-            #####################################
-            # NAVIGATE TO PROJECT
-            #####################################
-            logger.info(f"Opening Sonar project dashboard: {target_url}")
+            session.logged_in = True
+
+        #####################################
+        # NAVIGATE TO PROJECT
+        #####################################
+        logger.info(f"Opening Sonar project dashboard: {target_url}")
+        page.goto(target_url, wait_until="domcontentloaded", timeout=90000)
+
+        if _LOGIN_PATH in page.url:
+            # Sesi SonarQube kedaluwarsa -> login ulang lalu buka dashboard lagi
+            logger.info("Sonar session expired, logging in again.")
+            session.logged_in = False
+            if not _login(page, sonar_web_url, sonar_user, sonar_pass):
+                return None
+            session.logged_in = True
             page.goto(target_url, wait_until="domcontentloaded", timeout=90000)
+            if _LOGIN_PATH in page.url:
+                # Login "berhasil" tapi tetap diarahkan ke halaman login -> jangan screenshot halaman login
+                session.logged_in = False
+                raise RuntimeError("Still redirected to the SonarQube login page after re-login.")
 
-            try:
-                page.wait_for_selector(
-                    "div[data-test='overview__quality-gate-panel']", timeout=90000
-                )
-                logger.info("Dashboard panel loaded.")
-            except Exception:
-                logger.warning("Dashboard panel not detected, continue anyway.")
+        try:
+            page.wait_for_selector(
+                "div[data-test='overview__quality-gate-panel']", timeout=90000
+            )
+            logger.info("Dashboard panel loaded.")
+        except Exception:
+            logger.warning("Dashboard panel not detected, continue anyway.")
 
-            #####################################
-            # POLLING BADGE
-            #####################################
-            badge_selector = _get_quality_gate_badge_selector(page)
+        #####################################
+        # POLLING BADGE
+        #####################################
+        badge_selector = _get_quality_gate_badge_selector(page)
 
-            quality_gate_updated = False
-            quality_gate_status = None
-            waited_ms = 0
+        quality_gate_updated = False
+        quality_gate_status = None
+        waited_ms = 0
 
-            if badge_selector:
-                logger.info("Polling badge update...")
-                try:
-                    quality_gate_updated, quality_gate_status, waited_ms = (
-                        _wait_for_quality_gate_update(
-                            page,
-                            badge_selector,
-                            max_wait_ms=max_wait_ms,
-                            interval_ms=interval_ms,
-                        )
+        if badge_selector:
+            logger.info("Polling badge update...")
+            try:
+                quality_gate_updated, quality_gate_status, waited_ms = (
+                    _wait_for_quality_gate_update(
+                        page,
+                        badge_selector,
+                        max_wait_ms=max_wait_ms,
                     )
-                except Exception as e:
-                    logger.error(f"Polling crashed: {e}")
-            else:
-                logger.info("Skipping badge polling (selector not found).")
-
-            #####################################
-            # FIXED DELAY 30 SECONDS
-            #####################################
-            logger.info(f"Waiting {fixed_delay_ms} ms fixed delay (30 seconds)...")
-            page.wait_for_timeout(fixed_delay_ms)
+                )
+            except Exception as e:
+                logger.error(f"Polling crashed: {e}")
+            if quality_gate_status is None:
+                # Badge tidak terbaca dengan selector ini -> deteksi ulang di screenshot berikutnya
+                _forget_badge_selector()
+        else:
+            logger.info("Skipping badge polling (selector not found).")
+
+        #####################################
+        # WAIT UNTIL SETTLED (network idle + badge stable)
+        #####################################
+        settle_ms = _wait_for_dashboard_settled(page, badge_selector, stability_ms)
+
+        #####################################
+        # TAKE SCREENSHOT
+        #####################################
+        fmt = _get_screenshot_format()
+        filename = f"{project_key}-{uuid.uuid4()}{_FORMAT_EXTENSIONS[fmt]}"
+        filepath = os.path.join(SCREENSHOT_DIR, filename)
+
+        if clip_rect and all(k in clip_rect for k in ["x", "y", "width", "height"]):
+            _capture_screenshot(page, filepath, fmt, clip=clip_rect)
+        elif selector:
+            try:
+                _capture_screenshot(page.locator(selector), filepath, fmt)
+            except Exception:
+                _capture_screenshot(page, filepath, fmt, full_page=True)
+        else:
+            _capture_screenshot(page, filepath, fmt, full_page=True)
 
-            #####################################
-            # TAKE SCREENSHOT
-            #####################################
-            filename = f"{project_key}-{uuid.uuid4()}.png"
-            filepath = os.path.join(SCREENSHOT_DIR, filename)
+        logger.info(f"Screenshot saved: {filepath}")
 
-            try:
-                if clip_rect and all(k in clip_rect for k in ["x", "y", "width", "height"]):
-                    page.screenshot(path=filepath, clip=clip_rect)
-                elif selector:
-                    try:
-                        page.locator(selector).screenshot(path=filepath)
-                    except Exception:
-                        page.screenshot(path=filepath, full_page=True)
-                else:
-                    page.screenshot(path=filepath, full_page=True)
-
-                logger.info(f"Screenshot saved: {filepath}")
-            finally:
-                browser.close()
-
-            return {
-                "display_url": f"/static/screenshots/{filename}",
-                "filename": filename,
-                "quality_gate_updated": quality_gate_updated,
-                "quality_gate_status": quality_gate_status,
-                "waited_ms": waited_ms,
-                "fixed_delay_ms": fixed_delay_ms,
-            }
+        return {
+            "display_url": f"/static/screenshots/{filename}",
+            "filename": filename,
+            "quality_gate_updated": quality_gate_updated,
+            "quality_gate_status": quality_gate_status,
+            "waited_ms": waited_ms,
+            "settle_ms": settle_ms,
+        }
 
     except Exception as e:
         logger.error(f"Unexpected screenshot error: {e}")
+        # Browser mungkin crash / state rusak -> mulai sesi baru di panggilan berikutnya
+        _close_browser_session()
+        page = None
         return None
+    finally:
+        # Hanya page yang ditutup; browser & context dipakai ulang
+        if page is not None:
+            try:
+                page.close()
+            except Exception:
+                pass
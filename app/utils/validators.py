@@ -1,8 +1,31 @@
 import re
 
-GITHUB_URL_PATTERN = re.compile(r'^(https?://)?(www\.)?github\.com/[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+(\.git)?/?$')
-BRANCH_PATTERN = re.compile(r'^(?!-)(?!\/)(?!.*\/\/)(?!.*\.\.)(?!.*\/$)[A-Za-z0-9._/-]+$')
-PROJECT_KEY_PATTERN = re.compile(r'^[A-Za-z0-9._-]+$')
+try:
+    import re2 as _regex  # optional: google-re2 (DFA, waktu linear)
+except ImportError:  # fallback ke stdlib re
+    _regex = re
+
+# Semua pattern bebas lookahead/backreference agar bisa dijalankan oleh RE2.
+# fullmatch dipakai (bukan ^...$ + match) karena `$` di stdlib re juga cocok sebelum '\n' akhir.
+GITHUB_URL_PATTERN = _regex.compile(r'(https?://)?(www\.)?github\.com/[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+(\.git)?/?')
+# Hanya charset; aturan prefix/suffix/sequence terlarang dicek di _match_branch
+BRANCH_PATTERN = _regex.compile(r'[A-Za-z0-9._/-]+')
+PROJECT_KEY_PATTERN = _regex.compile(r'[A-Za-z0-9._-]+')
+
+# Bound method di-resolve sekali; validate_request dipanggil di setiap submit scan
+_match_github = GITHUB_URL_PATTERN.fullmatch
+_match_branch_chars = BRANCH_PATTERN.fullmatch
+_match_key = PROJECT_KEY_PATTERN.fullmatch
+
+def _match_branch(branch_name):
+    """Charset valid, tidak diawali '-' atau '/', tidak diakhiri '/', tanpa '//' dan '..'."""
+    return (
+        _match_branch_chars(branch_name) is not None
+        and not branch_name.startswith(('-', '/'))
+        and not branch_name.endswith('/')
+        and '//' not in branch_name
+        and '..' not in branch_name
+    )
 
 def extract_form_data(request):
     repo_url = request.form.get('repo_url', '').strip()
@@ -11,14 +34,12 @@ def extract_form_data(request):
     return repo_url, branch_name, project_key
 
 def validate_request(repo_url, branch_name, project_key):
-    if not GITHUB_URL_PATTERN.match(repo_url):
+    # Input sudah di-strip oleh extract_form_data; string kosong ditolak oleh regex (+)
+    if not _match_github(repo_url):
         return False, "Invalid repository URL."
-    if not BRANCH_PATTERN.match(branch_name):
+    if not _match_branch(branch_name):
         return False, "Invalid branch name."
-    project_key = project_key.strip()
-    if not project_key:
+    if not _match_key(project_key):
         return False, "Invalid project key."
-    if not PROJECT_KEY_PATTERN.match(project_key):
-        return False, "Invalid project key."
-        
+
     return True, None
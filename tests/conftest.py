@@ -0,0 +1,9 @@
+from unittest import mock
+
+
+def make_response(status_code, payload=None):
+    """Mock requests.Response: cukup status_code dan json() yang dipakai kode GitHub."""
+    resp = mock.Mock()
+    resp.status_code = status_code
+    resp.json.return_value = payload
+    return resp
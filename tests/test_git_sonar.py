@@ -0,0 +1,305 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from app.config import Config
+from app.utils import git_sonar
+
+_GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "test", "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "test", "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def _git(*args, cwd=None):
+    subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True,
+        env={**os.environ, **_GIT_IDENTITY},
+    )
+
+
+def _make_origin(root):
+    """Repo sumber lokal dengan branch main (main.txt) dan feature (feature.txt)."""
+    origin = os.path.join(root, "origin")
+    _git("init", "--quiet", "-b", "main", origin)
+    with open(os.path.join(origin, "main.txt"), "w") as f:
+        f.write("main\n")
+    _git("add", "main.txt", cwd=origin)
+    _git("commit", "--quiet", "-m", "main", cwd=origin)
+    _git("checkout", "--quiet", "-b", "feature", cwd=origin)
+    with open(os.path.join(origin, "feature.txt"), "w") as f:
+        f.write("feature\n")
+    _git("add", "feature.txt", cwd=origin)
+    _git("commit", "--quiet", "-m", "feature", cwd=origin)
+    _git("checkout", "--quiet", "main", cwd=origin)
+    return "file://" + origin
+
+
+class _GitTestCase(unittest.TestCase):
+    """Clone dari repo lokal (file://) dengan Config git default yang minimal."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.repo_url = _make_origin(self.root)
+        for name, value in (
+            ("GIT_REPO_CACHE", False),
+            ("GIT_PARTIAL_CLONE", False),
+            ("GIT_RECURSE_SUBMODULES", False),
+        ):
+            patcher = mock.patch.object(Config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _scan_spy(self):
+        """Ganti limited_sonar_scan: catat (tmp_dir, isi direktori) tanpa menjalankan scanner."""
+        calls = []
+
+        def fake_scan(tmp_dir, project_key, **kwargs):
+            calls.append((tmp_dir, sorted(n for n in os.listdir(tmp_dir) if n != ".git")))
+            return f"https://sonar.example.com/dashboard?id={project_key}"
+
+        patcher = mock.patch.object(git_sonar, "limited_sonar_scan", side_effect=fake_scan)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return calls
+
+
+class WorkdirReuseTest(_GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = git_sonar._WorkdirPool(2)
+        self.addCleanup(self.pool.clear)
+
+    def _scan(self, branch):
+        return git_sonar.clone_and_scan(
+            self.repo_url, branch, "proj", config={}, workdirs=self.pool
+        )
+
+    def test_next_scan_of_same_repo_reuses_the_workdir(self):
+        calls = self._scan_spy()
+        self._scan("main")
+        first_dir = calls[0][0]
+        # Sisa build / file untracked tidak boleh terbawa ke scan berikutnya
+        with open(os.path.join(first_dir, "leftover.log"), "w") as f:
+            f.write("x")
+
+        self._scan("feature")
+
+        self.assertEqual(calls[1][0], first_dir)
+        self.assertEqual(calls[0][1], ["main.txt"])
+        self.assertEqual(calls[1][1], ["feature.txt", "main.txt"])
+        self.assertTrue(os.path.isdir(first_dir))  # disimpan lagi untuk job berikutnya
+
+    def test_failed_refresh_falls_back_to_a_fresh_clone(self):
+        calls = self._scan_spy()
+        self._scan("main")
+        broken_dir = calls[0][0]
+        shutil.rmtree(os.path.join(broken_dir, ".git"))
+
+        self._scan("feature")
+
+        self.assertNotEqual(calls[1][0], broken_dir)
+        self.assertFalse(os.path.exists(broken_dir))
+        self.assertEqual(calls[1][1], ["feature.txt", "main.txt"])
+
+    def test_without_pool_workdir_is_removed(self):
+        calls = self._scan_spy()
+        git_sonar.clone_and_scan(self.repo_url, "main", "proj", config={})
+        self.assertFalse(os.path.exists(calls[0][0]))
+
+
+class ShmCacheCleanupTest(_GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shm = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.shm, True)
+        for patcher in (
+            mock.patch.object(git_sonar, "_SHM_DIR", self.shm),
+            mock.patch.object(git_sonar, "_pick_cache_root", return_value=self.shm),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_per_job_cache_in_shm_is_removed_after_scan(self):
+        seen = []
+        with mock.patch.object(
+            git_sonar, "limited_sonar_scan",
+            side_effect=lambda tmp_dir, project_key, **kw: seen.append(kw["custom_cache_dir"]),
+        ):
+            git_sonar.clone_and_scan(
+                self.repo_url, "main", "org/proj", per_job_cache=True,
+                config={"prefer_shm": True, "cache_dir": self.root},
+            )
+        self.assertTrue(seen[0].startswith(os.path.join(self.shm, "sonar-org_proj-")))
+        self.assertEqual(os.listdir(self.shm), [])
+
+    def test_parallel_jobs_get_separate_dirs(self):
+        config = {"prefer_shm": True}
+        first = git_sonar._shm_cache_dir(config, "proj")
+        second = git_sonar._shm_cache_dir(config, "proj")
+        self.assertNotEqual(first, second)
+        self.assertTrue(os.path.isdir(first) and os.path.isdir(second))
+
+
+class CachedCloneTest(_GitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_root = os.path.join(self.root, "git-cache")
+        for patcher in (
+            mock.patch.object(Config, "GIT_REPO_CACHE", True),
+            mock.patch.object(git_sonar, "_git_cache_root", return_value=self.cache_root),
+            # Eviction dianggap baru saja jalan; test eviction memanggilnya sendiri
+            mock.patch.object(git_sonar, "_last_cache_evict", time.monotonic()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _worktrees(self, cache_path):
+        out = subprocess.run(
+            ["git", "-C", cache_path, "worktree", "list", "--porcelain"],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        return [line.split(" ", 1)[1] for line in out.splitlines() if line.startswith("worktree ")]
+
+    def _clone(self, branch="main"):
+        tmp_dir = git_sonar.limited_clone(self.repo_url, branch)
+        self.addCleanup(git_sonar.remove_clone, tmp_dir)
+        return tmp_dir
+
+    def test_clone_is_a_registered_worktree_of_the_bare_cache(self):
+        tmp_dir = self._clone("feature")
+        cache_path = git_sonar._worktree_owners[tmp_dir]
+
+        self.assertEqual(os.path.dirname(cache_path), self.cache_root)
+        self.assertTrue(os.path.isfile(cache_path + ".lock"))
+        self.assertIn(os.path.realpath(tmp_dir), self._worktrees(cache_path))
+        self.assertTrue(os.path.isfile(os.path.join(tmp_dir, "feature.txt")))
+
+        git_sonar.remove_clone(tmp_dir)
+
+        self.assertNotIn(tmp_dir, git_sonar._worktree_owners)
+        self.assertFalse(os.path.exists(tmp_dir))
+        self.assertNotIn(os.path.realpath(tmp_dir), self._worktrees(cache_path))
+
+    def test_second_clone_reuses_the_same_cache(self):
+        first, second = self._clone("main"), self._clone("feature")
+        self.assertEqual(git_sonar._worktree_owners[first], git_sonar._worktree_owners[second])
+        self.assertEqual(len(os.listdir(self.cache_root)), 2)  # <repo>.git + <repo>.git.lock
+
+    def test_failed_submodule_update_leaves_no_stale_worktree(self):
+        real_run_git = git_sonar._run_git
+        worktrees = []
+
+        def run_git(cmd):
+            if "submodule" in cmd:
+                worktrees.append(cmd[cmd.index("-C") + 1])
+                raise subprocess.CalledProcessError(1, cmd, stderr="fatal: submodule failed")
+            return real_run_git(cmd)
+
+        with mock.patch.object(Config, "GIT_RECURSE_SUBMODULES", True), \
+                mock.patch.object(git_sonar, "_run_git", side_effect=run_git):
+            with self.assertRaises(RuntimeError):
+                git_sonar.limited_clone(self.repo_url, "main")
+
+        tmp_dir = worktrees[0]
+        cache_path = os.path.join(self.cache_root, git_sonar._cache_key(self.repo_url))
+        self.assertNotIn(tmp_dir, git_sonar._worktree_owners)
+        self.assertFalse(os.path.exists(tmp_dir))
+        self.assertEqual(self._worktrees(cache_path), [cache_path])
+
+    def _age(self, path, days):
+        stamp = time.time() - days * 24 * 60 * 60
+        os.utime(path, (stamp, stamp))
+
+    def test_stale_cache_is_evicted_with_its_lock_file(self):
+        tmp_dir = self._clone()
+        cache_path = git_sonar._worktree_owners[tmp_dir]
+        git_sonar.remove_clone(tmp_dir)
+        self._age(cache_path, 2)
+
+        with mock.patch.object(Config, "GIT_REPO_CACHE_MAX_AGE_DAYS", 1), \
+                mock.patch.object(git_sonar, "_last_cache_evict", None):
+            git_sonar._evict_stale_repo_caches()
+
+        self.assertFalse(os.path.exists(cache_path))
+        self.assertFalse(os.path.exists(cache_path + ".lock"))
+
+    def test_cache_with_live_worktree_is_kept(self):
+        tmp_dir = self._clone()
+        cache_path = git_sonar._worktree_owners[tmp_dir]
+        self._age(cache_path, 2)
+
+        with mock.patch.object(Config, "GIT_REPO_CACHE_MAX_AGE_DAYS", 1), \
+                mock.patch.object(git_sonar, "_last_cache_evict", None):
+            git_sonar._evict_stale_repo_caches()
+
+        self.assertTrue(os.path.isdir(cache_path))
+        self.assertIn(os.path.realpath(tmp_dir), self._worktrees(cache_path))
+
+
+class WorkdirPoolTest(_GitTestCase):
+    def _clone(self):
+        return git_sonar.limited_clone(self.repo_url, "main")
+
+    def test_evicts_least_recently_stored_dir_from_disk(self):
+        pool = git_sonar._WorkdirPool(1)
+        self.addCleanup(pool.clear)
+        first, second = self._clone(), self._clone()
+        self.assertTrue(pool.put("a", first))
+        self.assertTrue(pool.put("b", second))
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNone(pool.take("a"))
+        self.assertEqual(pool.take("b"), second)
+        git_sonar.remove_clone(second)
+
+    def test_occupied_slot_is_rejected(self):
+        # Dua job paralel untuk repo yang sama: hanya satu workdir yang disimpan
+        pool = git_sonar._WorkdirPool(2)
+        self.addCleanup(pool.clear)
+        first, second = self._clone(), self._clone()
+        self.assertTrue(pool.put("repo", first))
+        self.assertFalse(pool.put("repo", second))
+        git_sonar.remove_clone(second)
+
+    def test_take_hands_out_a_dir_once(self):
+        pool = git_sonar._WorkdirPool(2)
+        tmp_dir = self._clone()
+        pool.put("repo", tmp_dir)
+        self.assertEqual(pool.take("repo"), tmp_dir)
+        self.assertIsNone(pool.take("repo"))
+        git_sonar.remove_clone(tmp_dir)
+
+    def test_clear_removes_kept_dirs(self):
+        pool = git_sonar._WorkdirPool(2)
+        tmp_dir = self._clone()
+        pool.put("repo", tmp_dir)
+        pool.clear()
+        self.assertFalse(os.path.exists(tmp_dir))
+
+
+class SharedWorkdirPoolTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(git_sonar, "_shared_workdirs", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled_by_default(self):
+        with mock.patch.object(Config, "GIT_REUSE_WORKDIRS", False):
+            self.assertIsNone(git_sonar.shared_workdir_pool())
+
+    def test_one_pool_per_process_when_enabled(self):
+        with mock.patch.object(Config, "GIT_REUSE_WORKDIRS", True), \
+                mock.patch.object(git_sonar.atexit, "register") as register:
+            pool = git_sonar.shared_workdir_pool()
+            self.assertIsInstance(pool, git_sonar._WorkdirPool)
+            self.assertIs(git_sonar.shared_workdir_pool(), pool)
+        register.assert_called_once_with(pool.clear)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from app.utils import github_access as ga
+from tests.conftest import make_response
+
+
+class RepoStatusCacheTest(unittest.TestCase):
+    def setUp(self):
+        ga._clear_repo_check_cache()
+        patcher = mock.patch.object(ga, "_get_auth_header", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _session(self, *statuses):
+        patcher = mock.patch.object(ga, "GITHUB_SESSION")
+        session = patcher.start()
+        self.addCleanup(patcher.stop)
+        session.get.side_effect = [
+            s if isinstance(s, Exception) else make_response(s) for s in statuses
+        ]
+        return session
+
+    def test_found_and_not_found_are_cached(self):
+        session = self._session(200, 404)
+        self.assertTrue(ga.is_valid_github_repo("Org", "Repo"))
+        self.assertFalse(ga.is_valid_github_repo("org", "missing"))
+        # Key case-insensitive; tidak ada request tambahan
+        self.assertTrue(ga.is_valid_github_repo("org", "repo"))
+        self.assertFalse(ga.is_valid_github_repo("org", "missing"))
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        session = self._session(500, requests.ConnectionError("down"), 200)
+        self.assertEqual(ga._get_repo_status("org", "repo"), 500)
+        self.assertIsNone(ga._get_repo_status("org", "repo"))
+        self.assertEqual(ga._get_repo_status("org", "repo"), 200)
+        self.assertEqual(session.get.call_count, 3)
+
+    def test_entries_expire_after_ttl(self):
+        session = self._session(200, 404)
+        with mock.patch.object(ga.time, "monotonic", return_value=1000.0):
+            self.assertEqual(ga._get_repo_status("org", "repo"), 200)
+        with mock.patch.object(ga.time, "monotonic", return_value=1000.0 + ga.REPO_CHECK_TTL_SECONDS - 1):
+            self.assertEqual(ga._get_repo_status("org", "repo"), 200)
+        with mock.patch.object(ga.time, "monotonic", return_value=1000.0 + ga.REPO_CHECK_TTL_SECONDS):
+            self.assertEqual(ga._get_repo_status("org", "repo"), 404)
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_cache_size_is_bounded(self):
+        with mock.patch.object(ga, "REPO_CHECK_CACHE_SIZE", 2):
+            for name in ("a", "b", "c"):
+                ga._store_repo_status(("org", name), 200)
+            self.assertEqual(len(ga._repo_check_cache), 2)
+            self.assertIsNone(ga._cached_repo_status(("org", "a")))
+            self.assertEqual(ga._cached_repo_status(("org", "c")), 200)
+
+
+class InvalidateAuthCacheTest(unittest.TestCase):
+    def test_token_rotation_also_drops_cached_repo_statuses(self):
+        ga._store_repo_status(("org", "repo"), 404)
+        ga._invalidate_auth_cache()
+        self.assertIsNone(ga._cached_repo_status(("org", "repo")))
+
+
+class FindInvalidReposTest(unittest.TestCase):
+    def setUp(self):
+        ga._clear_repo_check_cache()
+
+    def test_returns_missing_repos_in_input_order(self):
+        statuses = {"a": 200, "b": 404, "c": None}
+        with mock.patch.object(ga, "_get_repo_status", side_effect=lambda org, repo: statuses[repo]):
+            self.assertEqual(ga._find_invalid_repos("org", ["a", "b", "c"]), ["b", "c"])
+
+    def test_unauthorized_and_rate_limited_raise(self):
+        for status in (401, 429):
+            with self.subTest(status=status), \
+                    mock.patch.object(ga, "_get_repo_status", return_value=status):
+                with self.assertRaises(ga.GitHubAccessError):
+                    ga._find_invalid_repos("org", ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from app.utils import github_role_checker as rc
+from tests.conftest import make_response
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+def _repo(login, permission):
+    return {"collaborators": {"edges": [{"permission": permission, "node": {"login": login}}]}}
+
+
+class BuildPermissionQueryTest(unittest.TestCase):
+    def test_one_alias_and_variable_per_repo(self):
+        query = rc._build_permission_query(2)
+        self.assertIn("$n0: String!", query)
+        self.assertIn("$n1: String!", query)
+        self.assertNotIn("$n2", query)
+        self.assertIn("r0: repository(owner: $owner, name: $n0)", query)
+        self.assertIn("r1: repository(owner: $owner, name: $n1)", query)
+
+
+class ParsePermissionBatchTest(unittest.TestCase):
+    def test_maps_graphql_permissions_to_rest_roles(self):
+        names = ["a", "b", "c", "d", "e"]
+        payload = {"data": {
+            "r0": _repo("alice", "ADMIN"),
+            "r1": _repo("alice", "MAINTAIN"),
+            "r2": _repo("alice", "WRITE"),
+            "r3": _repo("alice", "TRIAGE"),
+            "r4": _repo("alice", "READ"),
+        }}
+        results, unresolved = rc._parse_permission_batch(payload, names, "alice")
+        self.assertEqual([r["role"] for r in results], ["admin", "write", "write", "read", "read"])
+        self.assertTrue(all(r["status"] == "found" for r in results))
+        self.assertEqual(unresolved, [])
+
+    def test_login_match_is_exact_and_case_insensitive(self):
+        payload = {"data": {
+            "r0": _repo("alice-bot", "ADMIN"),
+            "r1": _repo("ALICE", "WRITE"),
+        }}
+        results, _ = rc._parse_permission_batch(payload, ["a", "b"], "alice")
+        self.assertEqual(results[0]["role"], "none")
+        self.assertEqual(results[1]["role"], "write")
+
+    def test_not_found_error_marks_repo_not_found(self):
+        payload = {
+            "data": {"r0": None},
+            "errors": [{"type": "NOT_FOUND", "path": ["r0"]}],
+        }
+        results, unresolved = rc._parse_permission_batch(payload, ["missing"], "alice")
+        self.assertEqual(results, [{"repo": "missing", "status": "not_found", "role": "-"}])
+        self.assertEqual(unresolved, [])
+
+    def test_other_errors_and_hidden_collaborators_are_unresolved(self):
+        payload = {
+            "data": {"r0": None, "r1": {"collaborators": None}},
+            "errors": [{"type": "FORBIDDEN", "path": ["r0"]}],
+        }
+        results, unresolved = rc._parse_permission_batch(payload, ["a", "b"], "alice")
+        self.assertEqual(results, [])
+        self.assertEqual(unresolved, ["a", "b"])
+
+
+class CheckUserPermissionsGraphqlTest(unittest.TestCase):
+    def test_without_auth_everything_goes_to_rest(self):
+        with mock.patch.object(rc, "GITHUB_SESSION") as session:
+            results, unresolved = rc.check_user_permissions_graphql("org", "alice", ["a", "b"], headers={})
+        session.post.assert_not_called()
+        self.assertEqual((results, unresolved), ([], ["a", "b"]))
+
+    def test_batches_repos_per_request(self):
+        names = [f"repo{i}" for i in range(rc.GRAPHQL_BATCH_SIZE + 1)]
+
+        def post(url, headers, json, timeout):
+            count = sum(1 for key in json["variables"] if key.startswith("n"))
+            return make_response(200, {"data": {f"r{i}": _repo("alice", "READ") for i in range(count)}})
+
+        with mock.patch.object(rc, "GITHUB_SESSION") as session:
+            session.post.side_effect = post
+            results, unresolved = rc.check_user_permissions_graphql("org", "alice", names, headers=AUTH)
+
+        self.assertEqual(session.post.call_count, 2)
+        self.assertEqual([r["repo"] for r in results], names)
+        self.assertEqual(unresolved, [])
+
+    def test_failed_batch_falls_back_to_rest(self):
+        with mock.patch.object(rc, "GITHUB_SESSION") as session:
+            session.post.return_value = make_response(502)
+            results, unresolved = rc.check_user_permissions_graphql("org", "alice", ["a"], headers=AUTH)
+        self.assertEqual((results, unresolved), ([], ["a"]))
+
+    def test_does_not_mutate_caller_headers(self):
+        headers = dict(AUTH)
+        with mock.patch.object(rc, "GITHUB_SESSION") as session:
+            session.post.return_value = make_response(200, {"data": {"r0": _repo("alice", "READ")}})
+            rc.check_user_permissions_graphql("org", "alice", ["a"], headers=headers)
+        self.assertEqual(headers, AUTH)
+
+
+class CheckUserPermissionsRestFallbackTest(unittest.TestCase):
+    def _run(self, get_side_effect):
+        repos = [{"name": "found"}, {"name": "missing"}, {"name": "broken"}, {"name": "offline"}]
+        with mock.patch.object(rc, "_get_auth_headers", return_value=dict(AUTH)), \
+                mock.patch.object(rc, "GITHUB_SESSION") as session:
+            session.post.return_value = make_response(200, {"data": {}})
+            session.get.side_effect = get_side_effect
+            results = rc.check_user_permissions("org", "alice", repos, max_workers=2)
+        return {r["repo"]: r for r in results}
+
+    def test_unresolved_repos_are_checked_via_rest(self):
+        def get(url, headers, timeout):
+            if "/found/" in url:
+                return make_response(200, {"permission": "write"})
+            if "/missing/" in url:
+                return make_response(404)
+            if "/broken/" in url:
+                return make_response(500)
+            raise requests.ConnectionError("down")
+
+        results = self._run(get)
+        self.assertEqual(results["found"], {"repo": "found", "status": "found", "role": "write"})
+        self.assertEqual(results["missing"], {"repo": "missing", "status": "not_found", "role": "-"})
+        self.assertEqual(results["broken"], {"repo": "broken", "status": "error", "role": "Error 500"})
+        self.assertEqual(results["offline"]["status"], "error")
+        self.assertTrue(results["offline"]["role"].startswith("NetError"))
+
+    def test_rest_is_skipped_when_graphql_resolves_everything(self):
+        with mock.patch.object(rc, "_get_auth_headers", return_value=dict(AUTH)), \
+                mock.patch.object(rc, "GITHUB_SESSION") as session:
+            session.post.return_value = make_response(200, {"data": {"r0": _repo("alice", "ADMIN")}})
+            results = rc.check_user_permissions("org", "alice", [{"name": "a"}])
+        session.get.assert_not_called()
+        self.assertEqual(results, [{"repo": "a", "status": "found", "role": "admin"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
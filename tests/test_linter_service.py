@@ -0,0 +1,131 @@
+import unittest
+
+from app.utils import linter_service
+from app.utils.linter_service import _LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = _LRUCache(2)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+        self.assertEqual(cache.get(b"a"), 1)  # a jadi paling baru
+        cache.put(b"c", 3)
+        self.assertIsNone(cache.get(b"b"))
+        self.assertEqual(cache.get(b"a"), 1)
+        self.assertEqual(cache.get(b"c"), 3)
+
+    def test_frequently_hit_entries_still_age_out(self):
+        cache = _LRUCache(2)
+        cache.put(b"hot", 1)
+        for _ in range(100):
+            cache.get(b"hot")
+        cache.put(b"x", 2)
+        cache.put(b"y", 3)
+        self.assertIsNone(cache.get(b"hot"))
+
+    def test_unique_inputs_do_not_churn_a_single_slot(self):
+        cache = _LRUCache(3)
+        for i in range(3):
+            cache.put(bytes([i]), i)
+        cache.put(b"new1", "n1")
+        cache.put(b"new2", "n2")
+        self.assertEqual(cache.get(b"new1"), "n1")
+        self.assertEqual(cache.get(b"new2"), "n2")
+
+    def test_put_existing_key_replaces_without_eviction(self):
+        cache = _LRUCache(2)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+        cache.put(b"a", 10)
+        self.assertEqual(cache.get(b"a"), 10)
+        self.assertEqual(cache.get(b"b"), 2)
+
+    def test_zero_size_disables_cache(self):
+        cache = _LRUCache(0)
+        cache.put(b"a", 1)
+        self.assertIsNone(cache.get(b"a"))
+
+    def test_clear(self):
+        cache = _LRUCache(2)
+        cache.put(b"a", 1)
+        cache.clear()
+        self.assertIsNone(cache.get(b"a"))
+
+
+class RunYamlLintingCacheTest(unittest.TestCase):
+    def setUp(self):
+        linter_service._lint_cache.clear()
+
+    def test_cached_result_is_a_copy(self):
+        content = "key:  value\n"
+        first = linter_service.run_yaml_linting(content)
+        first["problems"]["lines"].append(999)
+        second = linter_service.run_yaml_linting(content)
+        self.assertEqual(second["status"], "VALID_WITH_ISSUES")
+        self.assertNotIn(999, second["problems"]["lines"])
+
+
+class IterProblemsTest(unittest.TestCase):
+    def test_yields_rows_in_order(self):
+        result = {"status": "VALID_WITH_ISSUES", "problems": {
+            "lines": [1, 3], "cols": [5, 1],
+            "levels": ["warning", "error"], "messages": ["first", "second"],
+        }}
+        self.assertEqual(
+            list(linter_service.iter_problems(result)),
+            [(1, 5, "warning", "first"), (3, 1, "error", "second")],
+        )
+
+    def test_rows_match_lint_output(self):
+        result = linter_service.run_yaml_linting("a:  1\nb:  2\n")
+        rows = list(linter_service.iter_problems(result))
+        self.assertEqual([row[0] for row in rows], result["problems"]["lines"])
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        self.assertTrue(all(len(row) == 4 for row in rows))
+
+    def test_results_without_problems_yield_nothing(self):
+        self.assertEqual(list(linter_service.iter_problems({"status": "INVALID_SYNTAX"})), [])
+
+
+class RunYamlLintingBatchTest(unittest.TestCase):
+    def setUp(self):
+        linter_service._lint_cache.clear()
+
+    def tearDown(self):
+        pool = linter_service._batch_pool
+        if pool is not None:
+            pool.shutdown()
+            linter_service._batch_pool = None
+
+    def _contents(self, count):
+        # Campuran PERFECT / VALID_WITH_ISSUES / INVALID_SYNTAX dengan urutan yang bisa dicek
+        samples = []
+        for i in range(count):
+            if i % 3 == 0:
+                samples.append(f"---\nkey{i}: value\n")
+            elif i % 3 == 1:
+                samples.append(f"key{i}:  value\n")
+            else:
+                samples.append(f"key{i}: [unclosed\n")
+        return samples
+
+    def test_small_batch_runs_serially(self):
+        contents = self._contents(linter_service._BATCH_PARALLEL_MIN - 1)
+        results = linter_service.run_yaml_linting_batch(contents)
+        self.assertIsNone(linter_service._batch_pool)
+        self.assertEqual(results, [linter_service.run_yaml_linting(c) for c in contents])
+
+    def test_process_pool_keeps_input_order(self):
+        contents = self._contents(linter_service._BATCH_PARALLEL_MIN * 3)
+        results = linter_service.run_yaml_linting_batch(contents)
+        self.assertIsNotNone(linter_service._batch_pool)
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["PERFECT", "VALID_WITH_ISSUES", "INVALID_SYNTAX"] * linter_service._BATCH_PARALLEL_MIN,
+        )
+        self.assertEqual(results, [linter_service.run_yaml_linting(c) for c in contents])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import time
+import unittest
+from collections import OrderedDict
+from concurrent.futures import Future
+from unittest import mock
+
+from app import tasks
+from app.utils import git_sonar, screenshot_service
+
+
+class TaskHistoryTest(unittest.TestCase):
+    def setUp(self):
+        # Isolasi dari task milik test lain
+        patcher = mock.patch.object(tasks, "task_statuses", OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _add(self, task_id, updated_at=None):
+        tasks.task_statuses[task_id] = {
+            "task_id": task_id, "status": "Queued",
+            "_updated_at": time.monotonic() if updated_at is None else updated_at,
+        }
+
+    def test_update_publishes_a_new_snapshot(self):
+        self._add("t")
+        before = tasks.task_statuses["t"]
+        tasks._update_task("t", status="Running", log="héllo")
+        after = tasks.task_statuses["t"]
+        self.assertIsNot(after, before)
+        self.assertEqual(before["status"], "Queued")  # snapshot lama tidak dimutasi
+        self.assertNotIn("log", before)
+        self.assertEqual(after["status"], "Running")
+        self.assertEqual(after["log_size"], len("héllo".encode("utf-8")))
+
+    def test_update_of_evicted_task_is_ignored(self):
+        tasks._update_task("gone", status="Running")
+        self.assertNotIn("gone", tasks.task_statuses)
+
+    def test_recently_updated_task_survives_eviction(self):
+        for task_id in ("a", "b", "c"):
+            self._add(task_id)
+        tasks._update_task("a", status="Running")  # a pindah ke belakang (paling baru)
+        self._add("d")
+        with mock.patch.object(tasks, "MAX_TASK_HISTORY", 3):
+            tasks._cleanup_old_tasks()
+        self.assertEqual(list(tasks.task_statuses), ["c", "a", "d"])
+
+    def test_expired_tasks_are_dropped(self):
+        now = time.monotonic()
+        self._add("old", updated_at=now - tasks.TASK_HISTORY_TTL_SECONDS - 1)
+        self._add("fresh", updated_at=now)
+        tasks._cleanup_old_tasks()
+        self.assertEqual(list(tasks.task_statuses), ["fresh"])
+
+
+class ProcessJobTest(unittest.TestCase):
+    def setUp(self):
+        self.task_id = "job-under-test"
+        with tasks._status_lock:
+            tasks.task_statuses[self.task_id] = {"task_id": self.task_id, "status": "Queued", "_updated_at": 0}
+        self.addCleanup(tasks.task_statuses.pop, self.task_id, None)
+
+    def _job(self):
+        return {
+            "task_id": self.task_id,
+            "repo_url": "https://github.com/org/repo.git",
+            "branch_name": "main",
+            "project_key": "proj",
+        }
+
+    def test_scan_uses_shared_workdir_pool(self):
+        pool = object()
+        with mock.patch.object(git_sonar, "shared_workdir_pool", return_value=pool), \
+                mock.patch.object(git_sonar, "clone_and_scan", return_value="https://sonar/x") as scan, \
+                mock.patch.object(screenshot_service, "take_sonar_screenshot", return_value=None):
+            tasks._process_job(self._job())
+
+        self.assertIs(scan.call_args.kwargs["workdirs"], pool)
+        self.assertEqual(tasks.task_statuses[self.task_id]["status"], "Completed")
+
+
+class JobDoneCallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.task_id = "job-callback"
+        with tasks._status_lock:
+            tasks.task_statuses[self.task_id] = {"task_id": self.task_id, "status": "Queued", "_updated_at": 0}
+        self.addCleanup(tasks.task_statuses.pop, self.task_id, None)
+
+    def test_cancelled_future_marks_task_cancelled(self):
+        fut = Future()
+        self.assertTrue(fut.cancel())
+        tasks._log_job_exception(self.task_id, fut)
+        self.assertEqual(tasks.task_statuses[self.task_id]["status"], "Failed: Cancelled")
+
+    def test_unexpected_exception_is_recorded(self):
+        fut = Future()
+        fut.set_exception(ValueError("boom"))
+        tasks._log_job_exception(self.task_id, fut)
+        task = tasks.task_statuses[self.task_id]
+        self.assertEqual(task["status"], "Failed: An error occurred")
+        self.assertEqual(tasks.get_task_log(task), "Error: ValueError: boom")
+
+    def test_successful_future_leaves_status_alone(self):
+        fut = Future()
+        fut.set_result(None)
+        tasks._log_job_exception(self.task_id, fut)
+        self.assertEqual(tasks.task_statuses[self.task_id]["status"], "Queued")
+
+
+class CreateTaskConfigValidationTest(unittest.TestCase):
+    def test_missing_sonar_config_fails_before_task_is_queued(self):
+        config = {"host_url": "https://sonar.example.com", "login_token": ""}
+        before = dict(tasks.task_statuses)
+        with mock.patch.object(git_sonar, "_get_sonar_config", return_value=config), \
+                mock.patch.object(tasks, "_executor") as executor:
+            with self.assertRaises(git_sonar.SonarConfigError):
+                tasks.create_task("https://github.com/org/repo.git", "main", "proj")
+        executor.submit.assert_not_called()
+        self.assertEqual(dict(tasks.task_statuses), before)
+
+    def test_valid_config_queues_task(self):
+        config = {"host_url": "https://sonar.example.com", "login_token": "token"}
+        with mock.patch.object(git_sonar, "_get_sonar_config", return_value=config), \
+                mock.patch.object(tasks, "_executor") as executor:
+            task_id = tasks.create_task("https://github.com/org/repo.git", "main", "proj")
+        self.addCleanup(tasks.task_statuses.pop, task_id, None)
+        executor.submit.assert_called_once()
+        self.assertEqual(tasks.task_statuses[task_id]["status"], "Queued")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from app.utils.validators import _match_branch, validate_request
+
+
+class MatchBranchTest(unittest.TestCase):
+    def test_valid_branch_names(self):
+        for name in ("main", "feature/login", "release-1.2", "fix_bug", "a/b/c", "v1.0.0"):
+            with self.subTest(name=name):
+                self.assertTrue(_match_branch(name))
+
+    def test_invalid_branch_names(self):
+        for name in (
+            "",             # kosong
+            "-rf",          # diawali '-' (argument injection ke git)
+            "/main",        # diawali '/'
+            "main/",        # diakhiri '/'
+            "a//b",         # '//' berurutan
+            "a..b",         # '..'
+            "../etc",
+            "feat branch",  # spasi
+            "main\n",       # newline di akhir (fullmatch, bukan $)
+            "bad~name",
+        ):
+            with self.subTest(name=name):
+                self.assertFalse(_match_branch(name))
+
+
+class ValidateRequestTest(unittest.TestCase):
+    def test_accepts_valid_input(self):
+        self.assertEqual(
+            validate_request("https://github.com/org/repo.git", "main", "my-project"),
+            (True, None),
+        )
+
+    def test_reports_first_invalid_field(self):
+        self.assertEqual(
+            validate_request("https://gitlab.com/org/repo", "main", "key"),
+            (False, "Invalid repository URL."),
+        )
+        self.assertEqual(
+            validate_request("https://github.com/org/repo", "a..b", "key"),
+            (False, "Invalid branch name."),
+        )
+        self.assertEqual(
+            validate_request("https://github.com/org/repo", "main", "bad key"),
+            (False, "Invalid project key."),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()